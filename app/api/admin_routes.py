@@ -0,0 +1,119 @@
+import asyncio
+import hmac
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from ..utils.config import ADMIN_TOKEN, PROFILE_MAX_SECONDS
+from ..utils.profiling import (
+    StackSampler,
+    get_profile,
+    list_profiles,
+    start_tracemalloc,
+    stop_tracemalloc,
+    snapshot_top,
+    snapshot_diff
+)
+
+def is_admin_token(token: Optional[str]) -> bool:
+    """Check a token against ADMIN_TOKEN; always False when no token is configured"""
+    if not ADMIN_TOKEN or token is None:
+        return False
+    # Compare bytes: compare_digest rejects str arguments with non-ASCII characters
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not is_admin_token(x_admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+# Only one whole-process CPU profile runs at a time
+_cpu_profile_lock = asyncio.Lock()
+
+
+@router.post("/profile/cpu", response_class=PlainTextResponse)
+async def profile_cpu(seconds: float = 10):
+    """
+    Sample every thread's stack for the given number of seconds and return folded stacks
+    (one "frame;frame;frame count" line per stack, ready for flamegraph.pl or speedscope)
+    """
+    if seconds <= 0 or seconds > PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    if _cpu_profile_lock.locked():
+        raise HTTPException(status_code=409, detail="A CPU profile is already running")
+
+    async with _cpu_profile_lock:
+        sampler = StackSampler()
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            sampler.stop()
+    return sampler.folded()
+
+
+@router.get("/profiles")
+async def get_request_profiles():
+    """
+    List the stored per-request profiles (requests sent with X-Profile: 1 and a valid admin token)
+    """
+    return {"profiles": list_profiles()}
+
+
+@router.get("/profiles/{request_id}")
+async def get_request_profile(request_id: str, format: str = "json"):
+    """
+    Get a per-request profile: timed service sections and folded CPU stacks
+    """
+    profile = get_profile(request_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile.sampler.folded())
+    return profile.to_dict()
+
+
+@router.post("/tracemalloc/start")
+async def tracemalloc_start(frames: int = 10):
+    """
+    Start tracing memory allocations, keeping the given number of frames per allocation
+    """
+    if frames < 1 or frames > 65535:
+        raise HTTPException(status_code=400, detail="frames must be between 1 and 65535")
+    return {"started": start_tracemalloc(frames)}
+
+
+# The endpoints below are plain functions so that FastAPI runs them in the threadpool:
+# stopping, snapshotting and comparing can take seconds on a large heap
+
+@router.post("/tracemalloc/stop")
+def tracemalloc_stop():
+    """
+    Stop tracing memory allocations and drop the baseline snapshot
+    """
+    stop_tracemalloc()
+    return {"stopped": True}
+
+
+@router.post("/tracemalloc/snapshot")
+def tracemalloc_snapshot(limit: int = 20, group_by: str = "lineno"):
+    """
+    Take a snapshot of traced memory, return the top allocators and keep it as the diff baseline
+    """
+    try:
+        return snapshot_top(limit, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/tracemalloc/diff")
+def tracemalloc_diff(limit: int = 20, group_by: str = "lineno"):
+    """
+    Compare traced memory with the baseline snapshot and return the largest growth
+    """
+    try:
+        return snapshot_diff(limit, group_by)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,86 +1,348 @@
-from fastapi import APIRouter, File, UploadFile, HTTPException, Depends, Request
-from ..models.models import TranscriptionResponse, ChatRequest, ChatResponse, TextToSpeechRequest
-from ..services.openai_service import OpenAIService
-from ..services.elevenlabs_service import ElevenLabsService
-from ..utils.audio_utils import save_upload_file, convert_webm_to_wav
-from ..utils.config import DEFAULT_VOICE_ID
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from functools import lru_cache
+from typing import List, Optional
+from fastapi import APIRouter, File, Form, UploadFile, HTTPException, Depends, Request, Header, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from ..models.models import (
+    TranscriptionResponse,
+    TranscriptionJob,
+    TranscriptionJobBatch,
+    ChatRequest,
+    ChatResponse,
+    TextToSpeechRequest
+)
+from ..services.providers.base import ChatProvider, SpeechProvider
+from ..services.providers.registry import get_chat_provider, get_speech_provider, transcribe
+from ..services.phrase_cache import PhraseCache
+from ..services.chat_routing import ChatRouter
+from ..services.idempotency import (
+    run_idempotent,
+    fingerprint,
+    IdempotencyConflictError,
+    IdempotencyTimeoutError
+)
+from ..services.transcription_jobs import TranscriptionWorkerPool, job_to_response, validate_webhook_url
+from ..utils.audio_utils import (
+    save_upload_file,
+    convert_webm_to_wav,
+    validate_audio_file,
+    UploadTooLargeError,
+    UnsupportedAudioError
+)
+from ..utils.config import (
+    DEFAULT_VOICE_ID,
+    PHRASE_CACHE_ENABLED,
+    MAX_BATCH_FILES,
+    CHAT_ROUTING_ENABLED,
+    IDEMPOTENCY_KEY_MAX_LENGTH
+)
+from ..utils.job_utils import create_jobs, get_job, get_batch_jobs
 from ..utils.db_utils import (
     get_visitor_stats, 
     increment_button_count, 
     check_button_usage, 
     get_total_visitors,
-    get_usage_stats
+    get_usage_stats,
+    visitor_key
 )
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 # Dependency Injection
-def get_openai_service():
-    return OpenAIService()
+# Providers are selected by config, built once on first use and shared across requests
+def get_chat():
+    return get_chat_provider()
+
+def get_speech():
+    # Fixed phrases are served from the pre-synthesized cache in front of the provider
+    return get_phrase_cache() if PHRASE_CACHE_ENABLED else get_speech_provider()
+
+@lru_cache(maxsize=None)
+def get_phrase_cache():
+    return PhraseCache(get_speech_provider())
+
+@lru_cache(maxsize=None)
+def get_chat_router():
+    return ChatRouter()
+
+@lru_cache(maxsize=None)
+def get_transcription_pool():
+    return TranscriptionWorkerPool(transcribe)
+
+SUPPORTED_AUDIO_EXTENSIONS = ('.webm', '.mp3', '.wav', '.m4a')
+
+
+def check_idempotency_key(idempotency_key: Optional[str]):
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= IDEMPOTENCY_KEY_MAX_LENGTH:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Idempotency-Key must be 1 to {IDEMPOTENCY_KEY_MAX_LENGTH} characters"
+        )
+
+
+def idempotency_scope(request: Request) -> str:
+    """Client identity that Idempotency-Keys are scoped to, so clients can't replay each other's results"""
+    ip_address = request.client.host if request.client else "127.0.0.1"
+    return visitor_key(ip_address, request.headers.get("user-agent", "Unknown")).hex()
+
 
-def get_elevenlabs_service():
-    return ElevenLabsService()
+def mark_replayed(response: Response, replayed: bool):
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
 
 
 @router.post("/transcribe", response_model=TranscriptionResponse)
 async def transcribe_audio(
-    file: UploadFile = File(...), 
-    openai_service: OpenAIService = Depends(get_openai_service)
+    request: Request,
+    response: Response,
+    file: UploadFile = File(...),
+    idempotency_key: Optional[str] = Header(None)
 ):
     """
-    Transcribe an audio file using OpenAI Whisper ASR
+    Transcribe an audio file using the configured ASR provider (OpenAI Whisper by default).
+    Retries with the same Idempotency-Key, or the same audio, get the stored transcript;
+    reusing an Idempotency-Key for different audio is rejected with 422.
     """
-    if file.filename is None or not file.filename.endswith(('.webm', '.mp3', '.wav', '.m4a')):
+    if file.filename is None or not file.filename.endswith(SUPPORTED_AUDIO_EXTENSIONS):
         raise HTTPException(status_code=400, detail="Unsupported file format")
+    check_idempotency_key(idempotency_key)
+    keys = [f"idempotency:transcribe:{idempotency_scope(request)}:{idempotency_key}"] if idempotency_key else []
+    file_path = None
+
+    def discard_upload():
+        # Uploads live under /static, so files that won't be transcribed are removed
+        if file_path and os.path.exists(file_path):
+            os.remove(file_path)
     
     try:
-        # Save the uploaded file
-        file_path = save_upload_file(file)
-        
-        # Convert webm to wav if needed
-        if file_path.endswith('.webm'):
-            file_path = convert_webm_to_wav(file_path)
-        
-        # Transcribe the audio
-        transcription = openai_service.transcribe_audio(file_path)
+        # Save the uploaded file, hashing it on the way so identical audio is only transcribed once
+        audio_hash = hashlib.sha256()
+        file_path = await run_in_threadpool(save_upload_file, file, hasher=audio_hash)
+
+        def run():
+            # Check the header before doing any transcoding
+            path = file_path
+            validate_audio_file(path)
+
+            # Convert webm to wav if needed. MediaRecorder webm has no duration in its header, so the
+            # conversion stops just past the duration limit and the limit is checked on the wav
+            if path.endswith('.webm'):
+                path = convert_webm_to_wav(path)
+                validate_audio_file(path)
+
+            # Transcribe the audio, routed by clip length
+            return transcribe(path)
+
+        # The audio hash goes first so that duplicates are coordinated on content, and is
+        # the fingerprint that an Idempotency-Key's stored transcript has to match
+        audio_fingerprint = audio_hash.hexdigest()
+        keys.insert(0, f"idempotency:transcribe:audio:{audio_fingerprint}")
+        transcription, replayed = await run_idempotent(keys, run, request_fingerprint=audio_fingerprint)
+        if replayed:
+            discard_upload()
+        mark_replayed(response, replayed)
         
         return {"text": transcription}
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except UnsupportedAudioError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyConflictError as e:
+        discard_upload()
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyTimeoutError as e:
+        discard_upload()
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error transcribing audio: {str(e)}")
 
 
+@router.post("/transcribe/jobs", response_model=TranscriptionJobBatch, status_code=202)
+async def create_transcription_jobs(
+    files: List[UploadFile] = File(...),
+    webhook_url: Optional[str] = Form(None),
+    pool: TranscriptionWorkerPool = Depends(get_transcription_pool)
+):
+    """
+    Queue one or more audio files for background transcription
+    """
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files; the maximum is {MAX_BATCH_FILES}")
+    for file in files:
+        if file.filename is None or not file.filename.endswith(SUPPORTED_AUDIO_EXTENSIONS):
+            raise HTTPException(status_code=400, detail=f"Unsupported file format: {file.filename}")
+    if webhook_url:
+        try:
+            await run_in_threadpool(validate_webhook_url, webhook_url)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    saved_files = []
+
+    def save_and_queue():
+        # Disk writes and header probes, kept off the event loop
+        for file in files:
+            file_path = save_upload_file(file)
+            saved_files.append((file_path, file.filename))
+            validate_audio_file(file_path)
+        return create_jobs(saved_files, webhook_url)
+
+    def remove_saved_files():
+        for file_path, _ in saved_files:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    try:
+        jobs = await run_in_threadpool(save_and_queue)
+    except (UploadTooLargeError, UnsupportedAudioError) as e:
+        # Reject the whole batch; remove files saved so far
+        remove_saved_files()
+        status_code = 413 if isinstance(e, UploadTooLargeError) else 400
+        raise HTTPException(status_code=status_code, detail=str(e))
+    except Exception as e:
+        remove_saved_files()
+        raise HTTPException(status_code=500, detail=f"Error queuing transcription: {str(e)}")
+
+    if jobs is None:
+        remove_saved_files()
+        raise HTTPException(status_code=500, detail="Error queuing transcription")
+
+    pool.notify()
+    return {
+        "batch_id": jobs[0]['batch_id'],
+        "jobs": [job_to_response(job) for job in jobs]
+    }
+
+
+@router.get("/transcribe/jobs", response_model=TranscriptionJobBatch)
+async def get_transcription_batch(batch_id: str):
+    """
+    Get the status of every job in a batch
+    """
+    jobs = get_batch_jobs(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    return {"batch_id": batch_id, "jobs": [job_to_response(job) for job in jobs]}
+
+
+@router.get("/transcribe/jobs/{job_id}", response_model=TranscriptionJob)
+async def get_transcription_job(job_id: str):
+    """
+    Get the status and result of a transcription job
+    """
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_response(job)
+
+
+@router.get("/transcribe/jobs/{job_id}/events")
+async def stream_transcription_job(job_id: str):
+    """
+    Stream job status changes as server-sent events until the job finishes
+    """
+    if await run_in_threadpool(get_job, job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        last_status = None
+        while True:
+            # SQLite reads run in the threadpool so polling doesn't block the event loop
+            job = await run_in_threadpool(get_job, job_id)
+            if job is None:
+                return
+            if job['status'] != last_status:
+                last_status = job['status']
+                yield f"event: {last_status}\ndata: {json.dumps(job_to_response(job))}\n\n"
+            if last_status in ('completed', 'failed'):
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat_completion(
     request: ChatRequest,
-    openai_service: OpenAIService = Depends(get_openai_service),
-    elevenlabs_service: ElevenLabsService = Depends(get_elevenlabs_service)
+    http_request: Request,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None),
+    chat_provider: ChatProvider = Depends(get_chat),
+    speech_provider: SpeechProvider = Depends(get_speech)
 ):
     """
-    Generate a chat response using GPT-4 and convert to speech using ElevenLabs
+    Generate a chat response (GPT-4 by default) and convert to speech (ElevenLabs by default).
+    A repeated Idempotency-Key replays the stored response.
     """
-    try:
+    check_idempotency_key(idempotency_key)
+    conversation_history = request.conversation_history if request.conversation_history is not None else []
+
+    def run():
         # Get chat completion
-        conversation_history = request.conversation_history if request.conversation_history is not None else []
-        response_text = openai_service.chat_completion(
-            request.message, 
-            conversation_history
-        )
+        route = None
+        if CHAT_ROUTING_ENABLED:
+            # Pick the model and max_tokens from the message's complexity and recent model latency
+            chat_router = get_chat_router()
+            route = chat_router.choose(request.message, conversation_history, request.latency_budget_ms)
+            started = time.perf_counter()
+            try:
+                response_text = chat_provider.chat(
+                    request.message,
+                    conversation_history,
+                    model=route["model"],
+                    max_tokens=route["max_tokens"]
+                )
+            except Exception:
+                # Failures count towards the model's p95 too, so an outage triggers the fallback
+                chat_router.record_failure(route, (time.perf_counter() - started) * 1000)
+                raise
+            chat_router.record(route, (time.perf_counter() - started) * 1000)
+        else:
+            response_text = chat_provider.chat(
+                request.message, 
+                conversation_history
+            )
         
         # Try to convert to speech, but handle the case where ElevenLabs API key is missing
         try:
-            audio_url = elevenlabs_service.text_to_speech(response_text)
+            audio_url = speech_provider.synthesize(response_text, DEFAULT_VOICE_ID)
             
             return {
                 "response": response_text,
-                "audio_url": audio_url
+                "audio_url": audio_url,
+                "route": route
             }
         except ValueError as e:
             # Return response without audio if there's an API key issue
-            print(f"Warning: Could not convert text to speech: {e}")
+            logger.warning("Could not convert text to speech: %s", e)
             return {
                 "response": response_text,
-                "audio_url": None
+                "audio_url": None,
+                "route": route
             }
+
+    try:
+        if not idempotency_key:
+            return run()
+        result, replayed = await run_idempotent(
+            [f"idempotency:chat:{idempotency_scope(http_request)}:{idempotency_key}"],
+            run,
+            request_fingerprint=fingerprint(request.model_dump())
+        )
+        mark_replayed(response, replayed)
+        return result
+    except IdempotencyConflictError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyTimeoutError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
@@ -88,15 +350,15 @@ async def chat_completion(
 @router.post("/text-to-speech")
 async def text_to_speech(
     request: TextToSpeechRequest,
-    elevenlabs_service: ElevenLabsService = Depends(get_elevenlabs_service)
+    speech_provider: SpeechProvider = Depends(get_speech)
 ):
     """
-    Convert text to speech using ElevenLabs
+    Convert text to speech using the configured TTS provider (ElevenLabs by default)
     """
     try:
         voice_id = request.voice_id if request.voice_id is not None else DEFAULT_VOICE_ID
         try:
-            audio_url = elevenlabs_service.text_to_speech(request.text, voice_id)
+            audio_url = speech_provider.synthesize(request.text, voice_id)
             return {"audio_url": audio_url}
         except ValueError as e:
             # Specifically catch the API key missing/invalid error
@@ -114,12 +376,12 @@ async def text_to_speech(
 
 
 @router.get("/voices")
-async def get_voices(elevenlabs_service: ElevenLabsService = Depends(get_elevenlabs_service)):
+async def get_voices(speech_provider: SpeechProvider = Depends(get_speech)):
     """
-    Get available voices from ElevenLabs
+    Get available voices from the configured TTS provider
     """
     try:
-        voices = elevenlabs_service.get_available_voices()
+        voices = speech_provider.list_voices()
         return {"voices": voices}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching voices: {str(e)}")
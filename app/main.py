@@ -1,13 +1,56 @@
+import uuid
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers
+
+from .api.voice_routes import router as voice_router, get_transcription_pool, get_phrase_cache
+from .api.admin_routes import router as admin_router, is_admin_token
+from .services.db_maintenance import DatabaseMaintenanceScheduler
+from .utils.config import (
+    ensure_directories,
+    report_config_status,
+    PHRASE_CACHE_ENABLED,
+    MAX_UPLOAD_BYTES,
+    MAX_BATCH_FILES,
+    GZIP_MINIMUM_SIZE,
+    GZIP_COMPRESS_LEVEL
+)
+from .utils.db_utils import init_db
+from .utils.page_cache import CachedStaticFiles, choose_encoding, preload_pages, get_page
+from .utils.logging_utils import setup_logging, shutdown_logging, request_id_var
+from .utils.profiling import RequestProfile, current_profile, store_profile
 
-from .api.voice_routes import router as voice_router
+db_maintenance = DatabaseMaintenanceScheduler()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Prepare the filesystem and database and start the background workers (and page rendering)
+    at startup; services are built on first use
+    """
+    setup_logging()
+    ensure_directories()
+    report_config_status()
+    init_db()
+    preload_pages()
+    get_transcription_pool().start()
+    db_maintenance.start()
+    if PHRASE_CACHE_ENABLED:
+        # Phrases already on disk are loaded now; missing ones are synthesized in the background
+        get_phrase_cache().start()
+    yield
+    if PHRASE_CACHE_ENABLED:
+        get_phrase_cache().stop()
+    db_maintenance.stop()
+    get_transcription_pool().stop()
+    shutdown_logging()
 
 # Create FastAPI application
-app = FastAPI(title="Voice AI Assistant")
+app = FastAPI(title="Voice AI Assistant", lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -18,21 +61,161 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+@app.middleware("http")
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile a single request when it carries X-Profile: 1 and a valid X-Admin-Token.
+    The profile is stored under the request id, returned in X-Profile-Id.
+    """
+    if request.headers.get("x-profile") != "1" or not is_admin_token(request.headers.get("x-admin-token")):
+        return await call_next(request)
+
+    profile = RequestProfile(request_id_var.get(), request.url.path)
+    token = current_profile.set(profile)
+    profile.start()
+    try:
+        response = await call_next(request)
+    finally:
+        profile.stop()
+        current_profile.reset(token)
+        store_profile(profile)
+    response.headers["X-Profile-Id"] = profile.request_id
+    return response
+
+# Registered after profiling_middleware so it wraps it and the request id is already set
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """
+    Tag each request with an id (taken from X-Request-ID if provided) for log correlation
+    """
+    request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
+# Largest accepted request body per upload endpoint, with headroom for multipart framing
+UPLOAD_REQUEST_LIMITS = {
+    "/api/voice/transcribe": MAX_UPLOAD_BYTES + 64 * 1024,
+    "/api/voice/transcribe/jobs": MAX_UPLOAD_BYTES * MAX_BATCH_FILES + 64 * 1024,
+}
+
+class UploadSizeLimitMiddleware:
+    """
+    Reject oversized uploads before they are spooled to disk: from Content-Length when present,
+    otherwise (chunked requests) by counting body bytes as they arrive and stopping at the limit
+    """
+
+    def __init__(self, app, limits):
+        self.app = app
+        self.limits = limits
 
-# Set up templates
-templates = Jinja2Templates(directory="app/templates")
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = self.limits.get(scope["path"].rstrip("/") or "/")
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        too_large = JSONResponse(
+            status_code=413,
+            content={"detail": f"Request body exceeds the maximum size of {limit} bytes for this endpoint"}
+        )
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > limit:
+            await too_large(scope, receive, send)
+            return
+
+        received = 0
+        exceeded = False
+
+        async def limited_receive():
+            nonlocal received, exceeded
+            if exceeded:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # Stop reading; the parser sees a disconnect and the response is replaced below
+                    exceeded = True
+                    return {"type": "http.disconnect"}
+            return message
+
+        response_started = False
+
+        async def limited_send(message):
+            nonlocal response_started
+            if not exceeded:
+                await send(message)
+                return
+            if message["type"] == "http.response.start" and not response_started:
+                response_started = True
+                await too_large(scope, receive, send)
+
+        try:
+            await self.app(scope, limited_receive, limited_send)
+        except Exception:
+            # Handlers that read the body themselves see the disconnect as ClientDisconnect
+            if not exceeded or response_started:
+                raise
+            response_started = True
+            await too_large(scope, receive, send)
+
+app.add_middleware(UploadSizeLimitMiddleware, limits=UPLOAD_REQUEST_LIMITS)
+
+class NegotiatedGZipMiddleware:
+    """
+    GZipMiddleware for API responses, applied only when Accept-Encoding allows gzip (q=0 honoured;
+    GZipMiddleware itself only looks for the substring). Pages served from memory negotiate their
+    own precompressed variants, and static files' ETags don't vary by encoding, so both are left alone.
+    """
+
+    def __init__(self, app, excluded_paths, excluded_prefixes, **gzip_options):
+        self.app = app
+        self.gzip = GZipMiddleware(app, **gzip_options)
+        self.excluded_paths = excluded_paths
+        self.excluded_prefixes = excluded_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and self._should_compress(scope):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
+
+    def _should_compress(self, scope):
+        path = scope["path"].rstrip("/") or "/"
+        if path in self.excluded_paths or any(path.startswith(prefix) for prefix in self.excluded_prefixes):
+            return False
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        return choose_encoding(accept_encoding, ("gzip", "identity")) == "gzip"
+
+# Compress API responses; audio and server-sent events are skipped by GZipMiddleware
+app.add_middleware(
+    NegotiatedGZipMiddleware,
+    excluded_paths=("/", "/test", "/static"),
+    excluded_prefixes=("/static/",),
+    minimum_size=GZIP_MINIMUM_SIZE,
+    compresslevel=GZIP_COMPRESS_LEVEL
+)
+
+# Mount static files
+app.mount("/static", CachedStaticFiles(directory="app/static"), name="static")
 
 # Include routers
 app.include_router(voice_router, prefix="/api/voice", tags=["voice"])
+app.include_router(admin_router, prefix="/api/admin", tags=["admin"])
 
 @app.get("/", response_class=HTMLResponse)
 async def get_home(request: Request):
     """
-    Serve the main web interface
+    Serve the main web interface, rendered and compressed once at startup
     """
-    return templates.TemplateResponse("index.html", {"request": request})
+    return get_page("index").response(request)
 
 @app.get("/health")
 async def health_check():
@@ -41,10 +224,9 @@ async def health_check():
     """
     return {"status": "ok"}
 
-@app.get("/test")
-async def get_test_page():
+@app.get("/test", response_class=HTMLResponse)
+async def get_test_page(request: Request):
     """
-    Serve the API test page
+    Serve the API test page from memory
     """
-    html_content = open("app/static/test.html", "r").read()
-    return HTMLResponse(content=html_content)
\ No newline at end of file
+    return get_page("test").response(request)
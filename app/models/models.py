@@ -1,16 +1,31 @@
 from typing import List, Dict, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 class TranscriptionResponse(BaseModel):
     text: str
 
+class TranscriptionJob(BaseModel):
+    job_id: str
+    batch_id: str
+    filename: Optional[str] = None
+    status: str
+    attempts: int = 0
+    text: Optional[str] = None
+    error: Optional[str] = None
+
+class TranscriptionJobBatch(BaseModel):
+    batch_id: str
+    jobs: List[TranscriptionJob]
+
 class ChatRequest(BaseModel):
     message: str
     conversation_history: Optional[List[Dict]] = []
+    latency_budget_ms: Optional[int] = Field(None, gt=0)  # Overrides CHAT_LATENCY_BUDGET_MS for this turn
 
 class ChatResponse(BaseModel):
     response: str
     audio_url: Optional[str] = None
+    route: Optional[Dict] = None  # Model, tier and max_tokens chosen by chat routing
 
 class TextToSpeechRequest(BaseModel):
     text: str
@@ -0,0 +1,165 @@
+import logging
+import random
+import re
+import time
+from typing import Dict, List, Optional
+
+from ..utils.config import (
+    OPENAI_CHAT_MODEL,
+    CHAT_FAST_MODEL,
+    CHAT_DEFAULT_MAX_TOKENS,
+    CHAT_SIMPLE_MAX_CHARS,
+    CHAT_SIMPLE_MAX_TOKENS,
+    CHAT_COMPLEX_MAX_TOKENS,
+    CHAT_LATENCY_BUDGET_MS,
+    CHAT_LATENCY_WINDOW,
+    CHAT_LATENCY_SAMPLE_TTL,
+    CHAT_PRIMARY_PROBE_RATE
+)
+from ..utils.cache_utils import get_shared_cache
+
+logger = logging.getLogger(__name__)
+
+# Latency sample recorded for a failed call
+FAILED_CALL_LATENCY_MS = float("inf")
+
+# Words that suggest the user wants reasoning or a long answer
+COMPLEX_HINTS = re.compile(
+    r"\b(why|how|explain|compare|difference|analy[sz]e|step[- ]by[- ]step|pros and cons|"
+    r"summari[sz]e|write|code|debug|calculate|plan|design|translate)\b",
+    re.IGNORECASE
+)
+# Code, math or structured input
+TECHNICAL_CHARS = re.compile(r"[{}\[\]<>=+*/^`$\\]|\d+\s*[-+*/^]\s*\d+")
+
+
+def classify_message(message: str, conversation_history: Optional[List[Dict]] = None) -> str:
+    """
+    Cheap complexity heuristic: returns "simple", "standard" or "complex"
+    """
+    text = message.strip()
+    hints = len(COMPLEX_HINTS.findall(text))
+    technical = bool(TECHNICAL_CHARS.search(text))
+    questions = text.count("?") + text.count("？")
+    words = len(text.split())
+
+    score = 0
+    score += 2 * min(hints, 2)
+    score += 2 if technical else 0
+    score += 1 if questions > 1 else 0
+    score += 1 if words > 40 else 0
+    score += 1 if words > 120 else 0
+    # Long conversations need more context handling
+    score += 1 if len(conversation_history or []) > 10 else 0
+
+    if score == 0 and len(text) <= CHAT_SIMPLE_MAX_CHARS:
+        return "simple"
+    if score >= 3:
+        return "complex"
+    return "standard"
+
+
+class LatencyTracker:
+    """
+    Recent call latencies per (model, tier), for p95 estimates.
+
+    Samples are kept in the shared cache so every worker process routes on the same
+    numbers. Samples older than max_age are ignored, so a model that was slow for a
+    while is tried again once its slow samples have aged out.
+    """
+
+    def __init__(self, window: int = CHAT_LATENCY_WINDOW, max_age: float = CHAT_LATENCY_SAMPLE_TTL,
+                 cache=None):
+        self.window = window
+        self.max_age = max_age
+        self.cache = cache or get_shared_cache()
+
+    def _key(self, model: str, tier: str):
+        return f"chat-latency:{model}:{tier}"
+
+    def _recent(self, model: str, tier: str) -> List[List[float]]:
+        cutoff = time.time() - self.max_age
+        samples = self.cache.get(self._key(model, tier)) or []
+        return [sample for sample in samples if sample[0] > cutoff]
+
+    def record(self, model: str, tier: str, latency_ms: float):
+        # Read-modify-write without a lock: concurrent records may drop a sample,
+        # which doesn't matter for a p95 estimate
+        samples = self._recent(model, tier)
+        samples.append([time.time(), latency_ms])
+        self.cache.set(self._key(model, tier), samples[-self.window:], ttl=self.max_age)
+
+    def p95(self, model: str, tier: str) -> Optional[float]:
+        """p95 latency in ms, or None until there are enough recent samples to be meaningful"""
+        samples = sorted(latency for _, latency in self._recent(model, tier))
+        if len(samples) < 5:
+            return None
+        return samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+
+
+class ChatRouter:
+    """
+    Chooses the model and max_tokens for each chat turn:
+
+    - simple (short acknowledgements, small talk): fast model, small max_tokens
+    - standard: primary model, default max_tokens
+    - complex (reasoning, code, long input): primary model, larger max_tokens
+
+    When the primary model's recent p95 latency for the tier is over the latency budget, the
+    turn is sent to the fast model instead. Complex turns only fall back when the request set
+    its own budget. While falling back, probe_rate of the turns still go to the primary model
+    so its latency is measured again.
+    """
+
+    def __init__(self, primary_model: str = OPENAI_CHAT_MODEL, fast_model: str = CHAT_FAST_MODEL,
+                 default_budget_ms: int = CHAT_LATENCY_BUDGET_MS, probe_rate: float = CHAT_PRIMARY_PROBE_RATE,
+                 latencies: Optional[LatencyTracker] = None):
+        self.primary_model = primary_model
+        self.fast_model = fast_model
+        self.default_budget_ms = default_budget_ms
+        self.probe_rate = probe_rate
+        self.latencies = latencies or LatencyTracker()
+
+    def choose(self, message: str, conversation_history: Optional[List[Dict]] = None,
+               latency_budget_ms: Optional[int] = None) -> Dict:
+        """Return the route for a turn: tier, model, max_tokens and the reason for the choice"""
+        tier = classify_message(message, conversation_history)
+        if tier == "simple":
+            return self._route(tier, self.fast_model, CHAT_SIMPLE_MAX_TOKENS, "simple message")
+
+        max_tokens = CHAT_COMPLEX_MAX_TOKENS if tier == "complex" else CHAT_DEFAULT_MAX_TOKENS
+        budget = latency_budget_ms or self.default_budget_ms
+        may_fall_back = tier == "standard" or latency_budget_ms is not None
+        p95 = self.latencies.p95(self.primary_model, tier)
+
+        if may_fall_back and p95 is not None and p95 > budget and self.fast_model != self.primary_model:
+            if random.random() < self.probe_rate:
+                return self._route(tier, self.primary_model, max_tokens,
+                                   f"probing {self.primary_model} (p95 {p95:.0f}ms over {budget}ms budget)")
+            return self._route(tier, self.fast_model, max_tokens,
+                               f"{self.primary_model} p95 {p95:.0f}ms over {budget}ms budget")
+        return self._route(tier, self.primary_model, max_tokens, f"{tier} message")
+
+    def record(self, route: Dict, latency_ms: float):
+        """Record how long the chosen model took"""
+        self.latencies.record(route["model"], route["tier"], latency_ms)
+        route["latency_ms"] = round(latency_ms, 1)
+        logger.info(
+            "Chat routed to %s (%s, max_tokens=%d) in %.0fms: %s",
+            route["model"], route["tier"], route["max_tokens"], latency_ms, route["reason"],
+            extra={"chat_route": route}
+        )
+
+    def record_failure(self, route: Dict, latency_ms: float):
+        """
+        Record a failed call as slower than any budget, so a model that is erroring or timing out
+        triggers the fallback just like a slow one
+        """
+        self.latencies.record(route["model"], route["tier"], FAILED_CALL_LATENCY_MS)
+        logger.warning(
+            "Chat call to %s (%s) failed after %.0fms", route["model"], route["tier"], latency_ms,
+            extra={"chat_route": route}
+        )
+
+    def _route(self, tier, model, max_tokens, reason):
+        return {"tier": tier, "model": model, "max_tokens": max_tokens, "reason": reason}
@@ -0,0 +1,59 @@
+import logging
+import os
+import threading
+
+from ..utils.config import DB_MAINTENANCE_INTERVAL
+from ..utils.cache_utils import get_shared_cache
+from ..utils.job_utils import purge_finished_jobs
+from ..utils.retention_utils import archive_inactive_visitors, compact_database
+
+logger = logging.getLogger(__name__)
+
+MAINTENANCE_LOCK_KEY = "db-maintenance:lock"
+
+
+class DatabaseMaintenanceScheduler:
+    """
+    Background thread that periodically archives inactive visitors, purges finished transcription
+    jobs and compacts the database, keeping this work off the request path.
+    Every worker process runs one, but a shared-cache lock held for the whole interval lets only
+    one of them do the work each interval.
+    """
+
+    def __init__(self, interval: int = DB_MAINTENANCE_INTERVAL):
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="db-maintenance", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def run_once(self):
+        """
+        Archive visitors and purge finished transcription jobs, then compact so the pages they
+        freed are released; purge expired cache entries
+        """
+        archived = archive_inactive_visitors()
+        purge_finished_jobs()
+        compact_database()
+        get_shared_cache().purge_expired()
+        return archived
+
+    def _run(self):
+        # Wait one interval before the first run so it doesn't compete with startup
+        while not self._stop.wait(self.interval):
+            if not get_shared_cache().add(MAINTENANCE_LOCK_KEY, os.getpid(), ttl=self.interval * 0.9):
+                continue
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.error("Error during database maintenance: %s", e)
@@ -1,8 +1,33 @@
-import requests
+import contextvars
+import logging
 import os
-import sys
-from ..utils.config import ELEVENLABS_API_KEY, ELEVENLABS_API_URL, DEFAULT_VOICE_ID
-from ..utils.audio_utils import save_audio_response
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
+from ..utils.config import (
+    ELEVENLABS_API_KEY,
+    ELEVENLABS_API_URL,
+    DEFAULT_VOICE_ID,
+    ELEVENLABS_MODEL_ID,
+    TTS_LONG_TEXT_THRESHOLD,
+    TTS_CHUNK_MAX_CHARS,
+    TTS_MAX_CONCURRENCY,
+    VOICES_CACHE_TTL
+)
+from ..utils.audio_utils import save_audio_response, concat_audio_responses
+from ..utils.text_utils import split_text_into_chunks
+from ..utils.cache_utils import get_shared_cache
+from ..utils.profiling import traced
+from .tts_routing import route_text, DEFAULT_VOICE_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+VOICES_CACHE_KEY = "elevenlabs:voices"
+VOICE_AVAILABLE_CACHE_KEY = "elevenlabs:voice-available:{}"
+
+
+class SynthesisConnectionError(ValueError):
+    """ElevenLabs could not be reached for a synthesis request"""
+
 
 class ElevenLabsService:
     def __init__(self):
@@ -11,8 +36,7 @@ class ElevenLabsService:
         
         # Check if API key is available
         if not self.api_key:
-            print("ERROR: ELEVENLABS_API_KEY is not set or empty!", file=sys.stderr)
-            print("Text-to-speech functionality will not work without a valid API key.", file=sys.stderr)
+            logger.error("ELEVENLABS_API_KEY is not set or empty! Text-to-speech functionality will not work without a valid API key.")
             
         self.api_url = ELEVENLABS_API_URL
         self.headers = {
@@ -21,65 +45,148 @@ class ElevenLabsService:
             "xi-api-key": self.api_key or ""  # Prevent None being passed as a header value
         }
     
+    @traced("elevenlabs.text_to_speech")
     def text_to_speech(self, text: str, voice_id: str = DEFAULT_VOICE_ID) -> str:
         """
         Convert text to speech using ElevenLabs API
         Returns the URL path to the generated audio file
         """
+        if len(text) > TTS_LONG_TEXT_THRESHOLD:
+            return self.text_to_speech_long(text, voice_id)
+
+        voice_id, model_id, voice_settings = self._resolve_voice_and_model(text, voice_id)
+        return save_audio_response(self._synthesize(text, voice_id, model_id, voice_settings))
+
+    @traced("elevenlabs.text_to_speech_long")
+    def text_to_speech_long(self, text: str, voice_id: str = DEFAULT_VOICE_ID) -> str:
+        """
+        Convert long text to speech by splitting it at sentence and clause boundaries
+        and synthesizing the chunks concurrently.
+        Returns the URL path to the joined audio file
+        """
+        chunks = split_text_into_chunks(text, TTS_CHUNK_MAX_CHARS)
+        if not chunks:
+            raise ValueError("Cannot convert empty text to speech.")
+
+        # Resolve voice and model once so every chunk sounds the same
+        voice_id, model_id, voice_settings = self._resolve_voice_and_model(text, voice_id)
+
+        logger.info("Long text to speech: %d chars in %d chunks", len(text), len(chunks))
+
+        try:
+            audio_chunks = self._synthesize_chunks(chunks, voice_id, model_id, voice_settings)
+        except SynthesisConnectionError:
+            if voice_id == DEFAULT_VOICE_ID:
+                raise
+            # Retry the whole reply so it isn't split between two voices
+            logger.info("Retrying long text with default voice %s", DEFAULT_VOICE_ID)
+            audio_chunks = self._synthesize_chunks(chunks, DEFAULT_VOICE_ID, model_id, voice_settings)
+
+        try:
+            return concat_audio_responses(audio_chunks)
+        except Exception as e:
+            error_msg = f"Error joining synthesized audio: {e}"
+            logger.error(error_msg)
+            raise ValueError(error_msg)
+
+    def _synthesize_chunks(self, chunks, voice_id, model_id, voice_settings):
+        """Synthesize chunks concurrently with one voice; returns the audio in input order"""
+        def synthesize_chunk(chunk):
+            return self._synthesize(chunk, voice_id, model_id, voice_settings, fallback_to_default_voice=False)
+
+        max_workers = max(1, min(TTS_MAX_CONCURRENCY, len(chunks)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # map() preserves input order, so the audio is joined in reading order.
+            # Each chunk runs in a copy of the caller's context to keep the request id in logs.
+            contexts = [contextvars.copy_context() for _ in chunks]
+            return list(executor.map(
+                lambda context, chunk: context.run(synthesize_chunk, chunk),
+                contexts,
+                chunks
+            ))
+
+    def _resolve_voice_and_model(self, text: str, voice_id: str):
+        """
+        Pick the voice, model and voice settings for the given text from its script
+        Returns a (voice_id, model_id, voice_settings) tuple
+        """
         # Early check for API key
         if not self.api_key:
             raise ValueError("ELEVENLABS_API_KEY environment variable is not set. Please set it to use text-to-speech features.")
-            
+
+        route = route_text(text)
+        multilingual = route.model_id != ELEVENLABS_MODEL_ID
+
+        # The route's preferred voice replaces the default, but not a voice the user picked
+        if route.voice_id and voice_id == DEFAULT_VOICE_ID:
+            voice_id = route.voice_id
+
+        # Safety check - if using a non-standard voice with non-English text, fall back to a safe voice
+        if multilingual and voice_id != DEFAULT_VOICE_ID and not self._voice_available(voice_id):
+            logger.warning("Voice ID %s not found or not accessible. Falling back to default voice.", voice_id)
+            voice_id = DEFAULT_VOICE_ID  # Fall back to Rachel which always works
+
+        logger.debug(
+            "Text to speech request: Voice ID=%s, Model=%s, Script=%s", voice_id, route.model_id, route.script,
+            extra={"voice_id": voice_id, "model_id": route.model_id, "script": route.script,
+                   "language": route.language, "text_length": len(text)}
+        )
+
+        return voice_id, route.model_id, route.voice_settings
+
+    def _voice_available(self, voice_id: str) -> bool:
+        """Whether the voice exists for this account; answers are shared across workers for VOICES_CACHE_TTL"""
+        import requests  # Imported lazily to keep startup fast
+
+        cache = get_shared_cache()
+        cache_key = VOICE_AVAILABLE_CACHE_KEY.format(voice_id)
+        available = cache.get(cache_key)
+        if available is not None:
+            return available
+
+        try:
+            check_response = requests.get(f"{self.api_url}/voices/{voice_id}", headers={"xi-api-key": self.api_key})
+        except Exception as e:
+            # Not cached, so the next request checks again
+            logger.warning("Error checking voice availability: %s", e)
+            return False
+
+        available = check_response.status_code == 200
+        cache.set(cache_key, available, ttl=VOICES_CACHE_TTL)
+        return available
+
+    @traced("elevenlabs.synthesize_request")
+    def _synthesize(self, text: str, voice_id: str, model_id: str, voice_settings: Optional[Dict] = None,
+                    fallback_to_default_voice: bool = True) -> bytes:
+        """
+        Send a single synthesis request to ElevenLabs
+        Returns the raw MP3 audio bytes
+        """
+        import requests  # Imported lazily to keep startup fast
+
         url = f"{self.api_url}/text-to-speech/{voice_id}/stream"
         
-        # Detect if text contains Chinese characters to use multilingual model
-        def contains_chinese(text):
-            return any('\u4e00' <= char <= '\u9fff' for char in text)
-        
-        has_chinese = contains_chinese(text)
-        
-        # Safety check - if using non-standard voice ID with Chinese text, fall back to a safe voice
-        if has_chinese and voice_id != DEFAULT_VOICE_ID:
-            try:
-                # For non-default voices, check if that voice exists first
-                check_voice_url = f"{self.api_url}/voices/{voice_id}"
-                check_response = requests.get(check_voice_url, headers={"xi-api-key": self.api_key})
-                
-                if check_response.status_code != 200:
-                    print(f"Voice ID {voice_id} not found or not accessible. Falling back to default voice.", file=sys.stderr)
-                    voice_id = DEFAULT_VOICE_ID  # Fall back to Rachel which always works
-            except Exception as e:
-                print(f"Error checking voice availability: {e}", file=sys.stderr)
-                voice_id = DEFAULT_VOICE_ID  # Fallback on any error
-        
-        # Use multilingual model for Chinese text to improve pronunciation
-        model_id = "eleven_multilingual_v2" if has_chinese else "eleven_monolingual_v1"
-        
         data = {
             "text": text,
             "model_id": model_id,
-            "voice_settings": {
-                "stability": 0.5,
-                "similarity_boost": 0.75
-            }
+            "voice_settings": voice_settings or DEFAULT_VOICE_SETTINGS
         }
         
-        print(f"Text to speech request: Voice ID={voice_id}, Model={model_id}, Contains Chinese={has_chinese}", file=sys.stderr)
-        
         try:
-            print(f"Sending request to ElevenLabs API at {url}")
-            print(f"Using API key starting with: {self.api_key[:4]}..." if self.api_key else "No API key available")
+            logger.debug("Sending request to ElevenLabs API at %s", url)
             
             response = requests.post(url, json=data, headers=self.headers)
             
             # Debug response
             if response.status_code != 200:
-                print(f"ElevenLabs API response status: {response.status_code}", file=sys.stderr)
                 try:
                     error_details = response.json()
-                    print(f"Error details: {error_details}", file=sys.stderr)
                 except:
-                    print(f"Error content: {response.text[:200]}", file=sys.stderr)
+                    error_details = response.text[:200]
+                logger.warning(
+                    "ElevenLabs API response status: %s, error details: %s", response.status_code, error_details,
+                    extra={"status_code": response.status_code}
+                )
             
             # Check for specific status codes
             if response.status_code == 401:
@@ -94,47 +201,60 @@ class ElevenLabsService:
                 
             response.raise_for_status()
             
-            # Save the audio file and return its URL
-            return save_audio_response(response.content)
+            return response.content
         except requests.RequestException as e:
             error_msg = f"Error connecting to ElevenLabs API: {e}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             # If this is a premium voice that's not available, try with default voice
-            if voice_id != DEFAULT_VOICE_ID:
-                print(f"Retrying with default voice {DEFAULT_VOICE_ID}", file=sys.stderr)
-                return self.text_to_speech(text, DEFAULT_VOICE_ID)
-            raise ValueError(error_msg)
+            if voice_id != DEFAULT_VOICE_ID and fallback_to_default_voice:
+                logger.info("Retrying with default voice %s", DEFAULT_VOICE_ID)
+                return self._synthesize(text, DEFAULT_VOICE_ID, model_id, voice_settings)
+            raise SynthesisConnectionError(error_msg)
         except Exception as e:
             error_msg = f"Error converting text to speech: {e}"
-            print(error_msg, file=sys.stderr)
+            logger.error(error_msg)
             raise ValueError(error_msg)  # Convert all errors to ValueError for consistent handling
     
-    def get_available_voices(self):
+    @traced("elevenlabs.get_available_voices")
+    def get_available_voices(self, fallback: bool = True):
         """
-        Get a list of available voices from ElevenLabs
+        Get a list of available voices from ElevenLabs.
+        On any error the default voice alone is returned, unless fallback is False, in which case
+        the error is raised, so callers can tell the real catalogue from the fallback list.
         """
+        try:
+            return self._fetch_voices()
+        except Exception as e:
+            if not fallback:
+                raise
+            logger.error("Error fetching voices, using default voice only: %s", e)
+            return [{"voice_id": DEFAULT_VOICE_ID, "name": "Rachel (Default)"}]
+
+    def _fetch_voices(self):
+        import requests  # Imported lazily to keep startup fast
+
         # Early check for API key
         if not self.api_key:
-            # Return default voice only if no API key
-            return [{"voice_id": DEFAULT_VOICE_ID, "name": "Rachel (Default)"}]
+            raise ValueError("ElevenLabs API key is not set")
+
+        # The catalogue is shared by all worker processes
+        cache = get_shared_cache()
+        cached_voices = cache.get(VOICES_CACHE_KEY)
+        if cached_voices is not None:
+            return cached_voices
             
         url = f"{self.api_url}/voices"
+        response = requests.get(
+            url, 
+            headers={"xi-api-key": self.api_key}
+        )
         
-        try:
-            response = requests.get(
-                url, 
-                headers={"xi-api-key": self.api_key}
-            )
+        # Check for specific status codes
+        if response.status_code == 401:
+            raise ValueError("ElevenLabs API returned 401 Unauthorized for voices request")
             
-            # Check for specific status codes
-            if response.status_code == 401:
-                print("ElevenLabs API returned 401 Unauthorized for voices request. Using default voice only.", file=sys.stderr)
-                return [{"voice_id": DEFAULT_VOICE_ID, "name": "Rachel (Default)"}]
-                
-            response.raise_for_status()
-            
-            return response.json()["voices"]
-        except Exception as e:
-            print(f"Error fetching voices: {e}", file=sys.stderr)
-            # Return default voice on error
-            return [{"voice_id": DEFAULT_VOICE_ID, "name": "Rachel (Default)"}]
\ No newline at end of file
+        response.raise_for_status()
+        
+        voices = response.json()["voices"]
+        cache.set(VOICES_CACHE_KEY, voices, ttl=VOICES_CACHE_TTL)
+        return voices
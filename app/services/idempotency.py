@@ -0,0 +1,106 @@
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+from ..utils.cache_utils import get_shared_cache
+from ..utils.config import (
+    IDEMPOTENCY_TTL,
+    IDEMPOTENCY_IN_FLIGHT_TTL,
+    IDEMPOTENCY_WAIT_SECONDS,
+    IDEMPOTENCY_POLL_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+PENDING = "pending"
+DONE = "done"
+
+
+class IdempotencyConflictError(Exception):
+    """An idempotency key was reused for a different request"""
+
+
+class IdempotencyTimeoutError(Exception):
+    """A duplicate request gave up waiting for the original to finish"""
+
+
+def fingerprint(payload) -> str:
+    """Stable hash of a JSON-serializable request payload"""
+    encoded = json.dumps(payload, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def get_completed(keys: List[str], request_fingerprint: Optional[str] = None):
+    """
+    Return the stored result for the first key that has finished, or None.
+    Every finished key is checked against the fingerprint, not only the one returned.
+    """
+    cache = get_shared_cache()
+    completed = []
+    for key in keys:
+        entry = cache.get(key)
+        if entry and entry.get("status") == DONE:
+            _check_fingerprint(key, entry, request_fingerprint)
+            completed.append(entry["result"])
+    return completed[0] if completed else None
+
+
+async def run_idempotent(keys: List[str], compute: Callable, request_fingerprint: Optional[str] = None,
+                         ttl: int = IDEMPOTENCY_TTL) -> Tuple[object, bool]:
+    """
+    Run compute() at most once per key across all workers and return (result, replayed).
+
+    The first key is used to mark the work as in flight; duplicates wait for the original
+    (polling the shared cache) instead of starting a second upstream call. The result is
+    stored under every key for ttl seconds. Failures are not stored, so a waiting duplicate
+    takes over and retries.
+    """
+    cache = get_shared_cache()
+    owner_key = keys[0]
+    deadline = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    waited = False
+
+    while True:
+        result = get_completed(keys, request_fingerprint)
+        if result is not None:
+            return result, True
+
+        marker = {"status": PENDING, "fingerprint": request_fingerprint}
+        if cache.add(owner_key, marker, ttl=IDEMPOTENCY_IN_FLIGHT_TTL):
+            break
+
+        entry = cache.get(owner_key)
+        if entry is None:
+            # Neither stored nor claimable: the cache is unavailable, so run without deduplication
+            logger.warning("Could not claim %s; running without deduplication", owner_key)
+            return await run_in_threadpool(compute), False
+        _check_fingerprint(owner_key, entry, request_fingerprint)
+        if time.monotonic() >= deadline:
+            raise IdempotencyTimeoutError("A request with the same key is still in progress")
+        if not waited:
+            logger.info("Waiting for in-flight request %s", owner_key)
+            waited = True
+        await asyncio.sleep(IDEMPOTENCY_POLL_INTERVAL)
+
+    try:
+        result = await run_in_threadpool(compute)
+    except Exception:
+        # A cancelled request leaves its claim to expire after IDEMPOTENCY_IN_FLIGHT_TTL
+        cache.delete(owner_key)
+        raise
+
+    entry = {"status": DONE, "fingerprint": request_fingerprint, "result": result}
+    for key in keys:
+        cache.set(key, entry, ttl=ttl)
+    return result, False
+
+
+def _check_fingerprint(key, entry, request_fingerprint):
+    stored = entry.get("fingerprint")
+    if request_fingerprint and stored and stored != request_fingerprint:
+        raise IdempotencyConflictError(f"Idempotency key {key.split(':')[-1]} was already used for a different request")
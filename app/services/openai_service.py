@@ -1,8 +1,16 @@
+import logging
 import os
-import sys
 from typing import List, Dict, Optional
-from openai import OpenAI
-from ..utils.config import OPENAI_API_KEY
+from ..utils.config import (
+    OPENAI_API_KEY,
+    OPENAI_TRANSCRIPTION_MODEL,
+    OPENAI_CHAT_MODEL,
+    FALLBACK_CHAT_REPLY,
+    CHAT_DEFAULT_MAX_TOKENS
+)
+from ..utils.profiling import traced
+
+logger = logging.getLogger(__name__)
 
 class OpenAIService:
     def __init__(self):
@@ -11,11 +19,20 @@ class OpenAIService:
         
         # Check if API key is available
         if not self.api_key:
-            print("ERROR: OPENAI_API_KEY is not set or empty!", file=sys.stderr)
-            print("Speech recognition and chat functionality will not work without a valid API key.", file=sys.stderr)
-            
-        self.client = OpenAI(api_key=self.api_key)
+            logger.error("OPENAI_API_KEY is not set or empty! Speech recognition and chat functionality will not work without a valid API key.")
+
+        self._client = None
+
+    @property
+    def client(self):
+        """OpenAI client, created on first use so the SDK isn't imported at startup"""
+        if self._client is None:
+            from openai import OpenAI
+
+            self._client = OpenAI(api_key=self.api_key)
+        return self._client
     
+    @traced("openai.transcribe_audio")
     def transcribe_audio(self, audio_file_path: str) -> str:
         """
         Transcribe audio using OpenAI's Whisper ASR
@@ -27,17 +44,19 @@ class OpenAIService:
         try:
             with open(audio_file_path, "rb") as audio_file:
                 transcript = self.client.audio.transcriptions.create(
-                    model="whisper-1",
+                    model=OPENAI_TRANSCRIPTION_MODEL,
                     file=audio_file
                 )
             return transcript.text
         except Exception as e:
-            print(f"Error transcribing audio: {e}", file=sys.stderr)
+            logger.error("Error transcribing audio: %s", e)
             raise
     
-    def chat_completion(self, message: str, conversation_history: Optional[List[Dict]] = None) -> str:
+    @traced("openai.chat_completion")
+    def chat_completion(self, message: str, conversation_history: Optional[List[Dict]] = None,
+                        model: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
         """
-        Generate a response using OpenAI's GPT-4 model
+        Generate a response using an OpenAI chat model (OPENAI_CHAT_MODEL unless model is given)
         """
         # Early check for API key
         if not self.api_key:
@@ -70,15 +89,15 @@ class OpenAIService:
         
         try:
             response = self.client.chat.completions.create(
-                model="gpt-4-turbo",  # Using the latest GPT-4 model
+                model=model or OPENAI_CHAT_MODEL,
                 messages=formatted_messages,
-                max_tokens=300,
+                max_tokens=max_tokens or CHAT_DEFAULT_MAX_TOKENS,
                 temperature=0.7,
             )
             content = response.choices[0].message.content
             if content is None:
-                return "I'm sorry, I couldn't generate a response. Please try again."
+                return FALLBACK_CHAT_REPLY
             return content
         except Exception as e:
-            print(f"Error generating chat response: {e}", file=sys.stderr)
+            logger.error("Error generating chat response: %s", e)
             raise
\ No newline at end of file
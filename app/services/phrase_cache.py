@@ -0,0 +1,242 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+from typing import Dict, List, Optional
+
+from ..utils.config import (
+    AUDIO_OUTPUT_DIR,
+    PHRASE_MANIFEST_PATH,
+    PHRASE_CACHE_DIR,
+    PHRASE_REFRESH_INTERVAL
+)
+from ..utils.cache_utils import get_shared_cache
+from .providers.base import SpeechProvider
+
+logger = logging.getLogger(__name__)
+
+CATALOGUE_FILE = "catalogue.json"
+
+
+def normalize_phrase(text: str) -> str:
+    """Normalize text so that trivially different renderings of a phrase match"""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def phrase_key(text: str) -> str:
+    """Stable file name stem for a phrase"""
+    return hashlib.sha1(normalize_phrase(text).encode("utf-8")).hexdigest()
+
+
+class PhraseCache(SpeechProvider):
+    """
+    Speech provider that serves fixed phrases from audio synthesized ahead of time.
+
+    The manifest (PHRASE_MANIFEST_PATH) maps voice ids to lists of phrases. Each phrase is
+    synthesized once with the wrapped provider and stored under PHRASE_CACHE_DIR, so matching
+    replies are served without a TTS call, even while the upstream is unavailable. A background
+    thread re-synthesizes everything when the provider's voice catalogue changes.
+
+    Every worker process runs the thread, but a shared-cache lock lets only one of them synthesize
+    at a time; it bumps a shared version number afterwards and the others reload their index.
+    File names include a hash of the audio, so a re-synthesized phrase gets a new URL.
+    """
+
+    name = "phrase-cache"
+
+    def __init__(self, provider: SpeechProvider, manifest_path: str = PHRASE_MANIFEST_PATH,
+                 cache_dir: str = PHRASE_CACHE_DIR, refresh_interval: int = PHRASE_REFRESH_INTERVAL):
+        self.provider = provider
+        self.manifest_path = manifest_path
+        self.cache_dir = cache_dir
+        self.refresh_interval = refresh_interval
+        self._index: Dict[tuple, str] = {}
+        self._version = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # SpeechProvider interface
+
+    def synthesize(self, text: str, voice_id: str) -> str:
+        url = self.lookup(text, voice_id)
+        if url is not None:
+            return url
+        return self.provider.synthesize(text, voice_id)
+
+    def list_voices(self, fallback: bool = True) -> List[Dict]:
+        return self.provider.list_voices(fallback=fallback)
+
+    # Cache management
+
+    def lookup(self, text: str, voice_id: str) -> Optional[str]:
+        """Return the URL of the pre-synthesized audio for text, if there is one"""
+        self._reload_if_changed()
+        return self._index.get((voice_id, phrase_key(text)))
+
+    @property
+    def _version_key(self):
+        return f"phrase-cache:{self.cache_dir}:version"
+
+    @property
+    def _warm_lock_key(self):
+        return f"phrase-cache:{self.cache_dir}:warm-lock"
+
+    def start(self):
+        """Load phrases already on disk, then synthesize missing ones in the background"""
+        self._version = get_shared_cache().get(self._version_key, 0)
+        self.load()
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="phrase-cache", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def load_manifest(self) -> Dict[str, List[str]]:
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return {voice_id: list(phrases) for voice_id, phrases in manifest.items()}
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.error("Error reading phrase manifest %s: %s", self.manifest_path, e)
+            return {}
+
+    def load(self):
+        """Index the pre-synthesized files on disk for the phrases in the manifest"""
+        index = {}
+        for voice_id, phrases in self.load_manifest().items():
+            voice_dir = os.path.join(self.cache_dir, voice_id)
+            if not os.path.isdir(voice_dir):
+                continue
+            # Files are named <phrase key>.<content hash><extension>
+            files = {name.split(".")[0]: name for name in os.listdir(voice_dir)}
+            for phrase in phrases:
+                key = phrase_key(phrase)
+                if key in files:
+                    index[(voice_id, key)] = self._url(voice_id, files[key])
+        with self._lock:
+            self._index = index
+        logger.info("Loaded %d pre-synthesized phrases", len(index))
+
+    def warm(self, force: bool = False) -> bool:
+        """
+        Synthesize every manifest phrase that isn't on disk yet (all of them if force).
+        Stops at the first failure, since the upstream is most likely unavailable.
+        Returns True if every phrase was handled, False if it stopped at a failure.
+        """
+        synthesized = 0
+        complete = True
+        for voice_id, phrases in self.load_manifest().items():
+            for phrase in phrases:
+                key = phrase_key(phrase)
+                if not force and (voice_id, key) in self._index:
+                    continue
+                try:
+                    url = self.provider.synthesize(phrase, voice_id)
+                except Exception as e:
+                    logger.warning("Could not pre-synthesize phrases for voice %s: %s", voice_id, e)
+                    complete = False
+                    break
+                self._store(voice_id, key, url)
+                synthesized += 1
+            if not complete:
+                break
+        if synthesized:
+            logger.info("Pre-synthesized %d phrases", synthesized)
+        return complete
+
+    def refresh_if_catalogue_changed(self):
+        """Re-synthesize all phrases if the provider's voice catalogue changed since the last run"""
+        try:
+            # No fallback list: a failed fetch would look like a catalogue change
+            voices = self.provider.list_voices(fallback=False)
+        except Exception as e:
+            logger.warning("Could not fetch voice catalogue: %s", e)
+            return False
+
+        fingerprint = hashlib.sha1(json.dumps(
+            sorted(voices, key=lambda voice: voice.get("voice_id", "")), sort_keys=True, default=str
+        ).encode("utf-8")).hexdigest()
+
+        catalogue_path = os.path.join(self.cache_dir, CATALOGUE_FILE)
+        previous = None
+        try:
+            with open(catalogue_path, "r") as f:
+                previous = json.load(f).get("fingerprint")
+        except (FileNotFoundError, ValueError):
+            pass
+
+        if previous == fingerprint:
+            return False
+
+        if previous is not None:
+            logger.info("Voice catalogue changed, re-synthesizing phrases")
+            if not self.warm(force=True):
+                # Keep the old fingerprint so the next run tries again
+                return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(catalogue_path, "w") as f:
+            json.dump({"fingerprint": fingerprint}, f)
+        return previous is not None
+
+    def _run(self):
+        cache = get_shared_cache()
+        while not self._stop.is_set():
+            # One worker process synthesizes at a time; the lock expires if its holder dies
+            if cache.add(self._warm_lock_key, os.getpid(), ttl=self.refresh_interval):
+                try:
+                    self.warm()
+                    self.refresh_if_catalogue_changed()
+                finally:
+                    cache.delete(self._warm_lock_key)
+            else:
+                self._reload_if_changed()
+            self._stop.wait(self.refresh_interval)
+
+    def _publish(self):
+        """Tell the other worker processes to reload their index"""
+        version = get_shared_cache().incr(self._version_key)
+        if version is not None:
+            self._version = version
+
+    def _reload_if_changed(self):
+        version = get_shared_cache().get(self._version_key, 0)
+        if version != self._version:
+            self._version = version
+            self.load()
+
+    def _store(self, voice_id: str, key: str, url: str):
+        """Move a freshly synthesized file into the phrase cache and index it"""
+        source = os.path.join(AUDIO_OUTPUT_DIR, os.path.basename(url))
+        extension = os.path.splitext(source)[1]
+        voice_dir = os.path.join(self.cache_dir, voice_id)
+        os.makedirs(voice_dir, exist_ok=True)
+
+        # The content hash in the name gives re-synthesized audio a new URL, so browser caches don't serve the old one
+        with open(source, "rb") as f:
+            content_hash = hashlib.sha1(f.read()).hexdigest()[:12]
+        filename = f"{key}.{content_hash}{extension}"
+
+        # Replace any previous rendering of the phrase, whatever its format
+        for name in os.listdir(voice_dir):
+            if name.split(".")[0] == key and name != filename:
+                os.remove(os.path.join(voice_dir, name))
+
+        shutil.move(source, os.path.join(voice_dir, filename))
+        with self._lock:
+            self._index[(voice_id, key)] = self._url(voice_id, filename)
+        self._publish()
+
+    def _url(self, voice_id: str, filename: str) -> str:
+        relative = os.path.relpath(os.path.join(self.cache_dir, voice_id, filename), AUDIO_OUTPUT_DIR)
+        return f"/static/audio/{relative.replace(os.sep, '/')}"
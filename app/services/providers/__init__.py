@@ -0,0 +1 @@
+# Initialize the providers package
\ No newline at end of file
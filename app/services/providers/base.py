@@ -0,0 +1,43 @@
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional
+
+
+class TranscriptionProvider(ABC):
+    """Speech-to-text engine"""
+
+    name = "base"
+
+    @abstractmethod
+    def transcribe(self, audio_file_path: str) -> str:
+        """Transcribe an audio file and return the text"""
+
+
+class ChatProvider(ABC):
+    """Conversational language model"""
+
+    name = "base"
+
+    @abstractmethod
+    def chat(self, message: str, conversation_history: Optional[List[Dict]] = None,
+             model: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        """
+        Generate a reply to message given the conversation so far.
+        model and max_tokens are hints from chat routing; providers may ignore them.
+        """
+
+
+class SpeechProvider(ABC):
+    """Text-to-speech engine"""
+
+    name = "base"
+
+    @abstractmethod
+    def synthesize(self, text: str, voice_id: str) -> str:
+        """Convert text to speech and return the URL path of the audio file"""
+
+    @abstractmethod
+    def list_voices(self, fallback: bool = True) -> List[Dict]:
+        """
+        List the voices this engine can use. Engines may answer errors with a default list;
+        with fallback=False they raise instead.
+        """
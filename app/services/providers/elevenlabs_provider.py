@@ -0,0 +1,19 @@
+from typing import Dict, List, Optional
+
+from ..elevenlabs_service import ElevenLabsService
+from .base import SpeechProvider
+
+
+class ElevenLabsSpeechProvider(SpeechProvider):
+    """Speech synthesis through the ElevenLabs API"""
+
+    name = "elevenlabs"
+
+    def __init__(self, service: Optional[ElevenLabsService] = None):
+        self.service = service or ElevenLabsService()
+
+    def synthesize(self, text: str, voice_id: str) -> str:
+        return self.service.text_to_speech(text, voice_id)
+
+    def list_voices(self, fallback: bool = True) -> List[Dict]:
+        return self.service.get_available_voices(fallback=fallback)
@@ -0,0 +1,52 @@
+import hashlib
+import io
+import wave
+from typing import Dict, List, Optional
+
+from ...utils.audio_utils import save_audio_response
+from ...utils.config import DEFAULT_VOICE_ID
+from .base import ChatProvider, SpeechProvider, TranscriptionProvider
+
+
+class FakeTranscriptionProvider(TranscriptionProvider):
+    """Deterministic transcription for tests: the same audio always yields the same text"""
+
+    name = "fake"
+
+    def transcribe(self, audio_file_path: str) -> str:
+        with open(audio_file_path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        return f"Fake transcription {digest}"
+
+
+class FakeChatProvider(ChatProvider):
+    """Deterministic chat for tests: echoes the message"""
+
+    name = "fake"
+
+    def chat(self, message: str, conversation_history: Optional[List[Dict]] = None,
+             model: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        turns = len(conversation_history or [])
+        return f"You said: {message} (turn {turns + 1})"
+
+
+class FakeSpeechProvider(SpeechProvider):
+    """Deterministic speech for tests: silence whose length depends on the text"""
+
+    name = "fake"
+
+    SAMPLE_RATE = 8000
+
+    def synthesize(self, text: str, voice_id: str) -> str:
+        # 50 ms of silence per character, capped at 10 seconds
+        frames = min(len(text) * self.SAMPLE_RATE // 20, self.SAMPLE_RATE * 10)
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(2)
+            wav.setframerate(self.SAMPLE_RATE)
+            wav.writeframes(b"\x00\x00" * frames)
+        return save_audio_response(buffer.getvalue(), extension="wav")
+
+    def list_voices(self, fallback: bool = True) -> List[Dict]:
+        return [{"voice_id": DEFAULT_VOICE_ID, "name": "Fake Voice"}]
@@ -0,0 +1,42 @@
+import logging
+import threading
+
+from ...utils.config import LOCAL_ASR_MODEL, LOCAL_ASR_DEVICE, LOCAL_ASR_COMPUTE_TYPE
+from .base import TranscriptionProvider
+
+logger = logging.getLogger(__name__)
+
+
+class LocalWhisperTranscriptionProvider(TranscriptionProvider):
+    """
+    On-host transcription with faster-whisper (CTranslate2), suited to short clips on CPU.
+    faster-whisper is an optional dependency; the model is loaded on first use.
+    """
+
+    name = "local"
+
+    def __init__(self, model_size: str = LOCAL_ASR_MODEL, device: str = LOCAL_ASR_DEVICE,
+                 compute_type: str = LOCAL_ASR_COMPUTE_TYPE):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    try:
+                        from faster_whisper import WhisperModel
+                    except ImportError:
+                        raise ValueError("The local ASR engine requires the faster-whisper package. Install it with `pip install faster-whisper`.")
+
+                    logger.info("Loading local ASR model %s on %s (%s)", self.model_size, self.device, self.compute_type)
+                    self._model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
+        return self._model
+
+    def transcribe(self, audio_file_path: str) -> str:
+        segments, _ = self.model.transcribe(audio_file_path, beam_size=1)
+        return "".join(segment.text for segment in segments).strip()
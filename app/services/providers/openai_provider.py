@@ -0,0 +1,29 @@
+from typing import Dict, List, Optional
+
+from ..openai_service import OpenAIService
+from .base import ChatProvider, TranscriptionProvider
+
+
+class OpenAITranscriptionProvider(TranscriptionProvider):
+    """Transcription through OpenAI Whisper"""
+
+    name = "openai"
+
+    def __init__(self, service: Optional[OpenAIService] = None):
+        self.service = service or OpenAIService()
+
+    def transcribe(self, audio_file_path: str) -> str:
+        return self.service.transcribe_audio(audio_file_path)
+
+
+class OpenAIChatProvider(ChatProvider):
+    """Chat through OpenAI chat completions"""
+
+    name = "openai"
+
+    def __init__(self, service: Optional[OpenAIService] = None):
+        self.service = service or OpenAIService()
+
+    def chat(self, message: str, conversation_history: Optional[List[Dict]] = None,
+             model: Optional[str] = None, max_tokens: Optional[int] = None) -> str:
+        return self.service.chat_completion(message, conversation_history, model=model, max_tokens=max_tokens)
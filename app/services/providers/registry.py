@@ -0,0 +1,130 @@
+import logging
+import threading
+from typing import Callable, Dict, Optional
+
+from ...utils.audio_utils import get_audio_duration
+from ...utils.profiling import traced
+from ...utils.config import (
+    ASR_PROVIDER,
+    CHAT_PROVIDER,
+    TTS_PROVIDER,
+    ASR_SHORT_CLIP_PROVIDER,
+    ASR_SHORT_CLIP_MAX_SECONDS
+)
+from .base import ChatProvider, SpeechProvider, TranscriptionProvider
+
+logger = logging.getLogger(__name__)
+
+
+def _openai_transcription():
+    from .openai_provider import OpenAITranscriptionProvider
+    return OpenAITranscriptionProvider()
+
+def _openai_chat():
+    from .openai_provider import OpenAIChatProvider
+    return OpenAIChatProvider()
+
+def _elevenlabs_speech():
+    from .elevenlabs_provider import ElevenLabsSpeechProvider
+    return ElevenLabsSpeechProvider()
+
+def _local_transcription():
+    from .local_provider import LocalWhisperTranscriptionProvider
+    return LocalWhisperTranscriptionProvider()
+
+def _fake(kind):
+    def factory():
+        from . import fake_provider
+        return {
+            "transcription": fake_provider.FakeTranscriptionProvider,
+            "chat": fake_provider.FakeChatProvider,
+            "speech": fake_provider.FakeSpeechProvider,
+        }[kind]()
+    return factory
+
+
+# Provider factories by kind and name; factories import their module on first use
+_FACTORIES: Dict[str, Dict[str, Callable]] = {
+    "transcription": {
+        "openai": _openai_transcription,
+        "local": _local_transcription,
+        "fake": _fake("transcription"),
+    },
+    "chat": {
+        "openai": _openai_chat,
+        "fake": _fake("chat"),
+    },
+    "speech": {
+        "elevenlabs": _elevenlabs_speech,
+        "fake": _fake("speech"),
+    },
+}
+
+_DEFAULTS = {
+    "transcription": ASR_PROVIDER,
+    "chat": CHAT_PROVIDER,
+    "speech": TTS_PROVIDER,
+}
+
+_instances = {}
+_lock = threading.Lock()
+
+
+def register_provider(kind: str, name: str, factory: Callable):
+    """Register (or replace) a provider factory"""
+    if kind not in _FACTORIES:
+        raise ValueError(f"Unknown provider kind: {kind}")
+    with _lock:
+        _FACTORIES[kind][name] = factory
+        _instances.pop((kind, name), None)
+
+
+def get_provider(kind: str, name: Optional[str] = None):
+    """Get the shared provider instance of the given kind, by name or the configured default"""
+    name = name or _DEFAULTS[kind]
+    key = (kind, name)
+    if key not in _instances:
+        with _lock:
+            if key not in _instances:
+                factory = _FACTORIES[kind].get(name)
+                if factory is None:
+                    raise ValueError(f"Unknown {kind} provider: {name}")
+                _instances[key] = factory()
+    return _instances[key]
+
+
+def get_transcription_provider(name: Optional[str] = None) -> TranscriptionProvider:
+    return get_provider("transcription", name)
+
+def get_chat_provider(name: Optional[str] = None) -> ChatProvider:
+    return get_provider("chat", name)
+
+def get_speech_provider(name: Optional[str] = None) -> SpeechProvider:
+    return get_provider("speech", name)
+
+
+def select_transcription_provider(audio_file_path: str) -> TranscriptionProvider:
+    """
+    Apply the routing rules: short clips go to the short-clip provider (by default the
+    on-host engine), everything else to the default transcription provider
+    """
+    if ASR_SHORT_CLIP_MAX_SECONDS > 0 and ASR_SHORT_CLIP_PROVIDER != ASR_PROVIDER:
+        duration = get_audio_duration(audio_file_path)
+        if duration is not None and duration < ASR_SHORT_CLIP_MAX_SECONDS:
+            return get_transcription_provider(ASR_SHORT_CLIP_PROVIDER)
+    return get_transcription_provider()
+
+
+@traced("asr.transcribe")
+def transcribe(audio_file_path: str) -> str:
+    """Transcribe with the routed provider, falling back to the default provider if it fails"""
+    provider = select_transcription_provider(audio_file_path)
+    default = get_transcription_provider()
+    if provider is default:
+        return provider.transcribe(audio_file_path)
+
+    try:
+        return provider.transcribe(audio_file_path)
+    except Exception as e:
+        logger.warning("Transcription provider %s failed, falling back to %s: %s", provider.name, default.name, e)
+        return default.transcribe(audio_file_path)
@@ -0,0 +1,192 @@
+import contextlib
+import ipaddress
+import logging
+import os
+import socket
+import threading
+from urllib.parse import urlparse
+
+from ..utils.audio_utils import convert_webm_to_wav, validate_audio_file
+from ..utils.config import (
+    TRANSCRIPTION_WORKERS,
+    TRANSCRIPTION_MAX_ATTEMPTS,
+    TRANSCRIPTION_JOB_LEASE_SECONDS,
+    TRANSCRIPTION_RETRY_BASE_SECONDS,
+    TRANSCRIPTION_POLL_INTERVAL,
+    WEBHOOK_ALLOWED_HOSTS
+)
+from ..utils.job_utils import claim_next_job, complete_job, fail_job, renew_lease
+
+logger = logging.getLogger(__name__)
+
+
+class TranscriptionWorkerPool:
+    """
+    Background worker threads that drain the SQLite-backed transcription job queue.
+    Workers in every process share the same queue, so throughput scales with the total worker count.
+    """
+
+    def __init__(self, transcribe, num_workers: int = TRANSCRIPTION_WORKERS):
+        """
+        transcribe is called with an audio file path and returns the text
+        (normally the provider registry's routed transcribe)
+        """
+        self.transcribe = transcribe
+        self.num_workers = max(1, num_workers)
+        self._threads = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+
+    def start(self):
+        """Start the worker threads"""
+        if self._threads:
+            return
+        self._stop.clear()
+        for index in range(self.num_workers):
+            thread = threading.Thread(
+                target=self._run, name=f"transcription-worker-{index}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        logger.info("Started %d transcription workers", self.num_workers)
+
+    def stop(self, timeout: float = 5.0):
+        """Signal the workers to stop and wait for them to finish their current job"""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        """Wake idle workers after new jobs are queued"""
+        self._wakeup.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = claim_next_job(TRANSCRIPTION_JOB_LEASE_SECONDS)
+            if job is None:
+                # Nothing runnable; sleep until notified or the next poll (picks up retries and expired leases)
+                self._wakeup.wait(TRANSCRIPTION_POLL_INTERVAL)
+                self._wakeup.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job):
+        job_id = job['id']
+        owner = job['lease_owner']
+
+        if job['attempts'] > TRANSCRIPTION_MAX_ATTEMPTS:
+            # The job was reclaimed after a crash more times than allowed
+            self._finish(fail_job(job_id, owner, job['error'] or "Exceeded maximum attempts"))
+            return
+
+        try:
+            with self._lease_heartbeat(job_id, owner):
+                file_path = job['file_path']
+                if file_path.endswith('.webm'):
+                    # A previous attempt may already have converted (and removed) the webm file
+                    wav_path = f"{os.path.splitext(file_path)[0]}.wav"
+                    file_path = wav_path if os.path.exists(wav_path) else convert_webm_to_wav(file_path)
+                    # webm headers usually carry no duration; the conversion stops just past
+                    # the limit, so check it on the wav
+                    validate_audio_file(file_path)
+
+                text = self.transcribe(file_path)
+            self._finish(complete_job(job_id, owner, text), file_path)
+        except Exception as e:
+            error = f"Error transcribing audio: {str(e)}"
+            if isinstance(e, ValueError) or job['attempts'] >= TRANSCRIPTION_MAX_ATTEMPTS:
+                # Configuration errors (e.g. missing API key) won't succeed on retry
+                logger.error("Transcription job %s failed: %s", job_id, e)
+                self._finish(fail_job(job_id, owner, error), job['file_path'])
+            else:
+                retry_in = TRANSCRIPTION_RETRY_BASE_SECONDS * (2 ** (job['attempts'] - 1))
+                logger.warning("Transcription job %s failed (attempt %d), retrying in %ss: %s",
+                               job_id, job['attempts'], retry_in, e)
+                fail_job(job_id, owner, error, retry_in=retry_in)
+
+    @contextlib.contextmanager
+    def _lease_heartbeat(self, job_id, owner, lease_seconds=TRANSCRIPTION_JOB_LEASE_SECONDS):
+        """Renew the job's lease every third of its length while the body runs"""
+        done = threading.Event()
+
+        def renew():
+            while not done.wait(lease_seconds / 3):
+                if not renew_lease(job_id, owner, lease_seconds):
+                    logger.warning("Lost the lease on transcription job %s", job_id)
+                    return
+
+        thread = threading.Thread(target=renew, name=f"lease-{job_id[:8]}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _finish(self, job, file_path=None):
+        """Clean up after a job reaches a terminal status and send its webhook"""
+        if job is None:
+            # Not finished by us: the lease was lost and another worker owns the job (and its files)
+            return
+
+        for path in {file_path, job['file_path']}:
+            if path and os.path.exists(path):
+                try:
+                    os.remove(path)
+                except OSError as e:
+                    logger.warning("Could not remove upload %s: %s", path, e)
+
+        if job.get('webhook_url'):
+            send_job_webhook(job)
+
+
+def job_to_response(job):
+    """Public representation of a job row"""
+    return {
+        "job_id": job['id'],
+        "batch_id": job['batch_id'],
+        "filename": job['filename'],
+        "status": job['status'],
+        "attempts": job['attempts'],
+        "text": job['text'],
+        "error": job['error'] if job['status'] == 'failed' else None,
+    }
+
+
+def validate_webhook_url(url):
+    """
+    Raise ValueError unless url is https, its host is allowed (WEBHOOK_ALLOWED_HOSTS, if set)
+    and every address it resolves to is public, so webhooks can't reach internal services
+    """
+    parsed = urlparse(url)
+    if parsed.scheme != "https" or not parsed.hostname:
+        raise ValueError("webhook_url must be an https URL")
+    host = parsed.hostname.lower()
+    if WEBHOOK_ALLOWED_HOSTS and host not in WEBHOOK_ALLOWED_HOSTS:
+        raise ValueError(f"webhook_url host {host} is not allowed")
+
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or 443, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"webhook_url host {host} could not be resolved: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%")[0])
+        if not ip.is_global or ip.is_multicast:
+            raise ValueError(f"webhook_url host {host} resolves to a non-public address")
+
+
+def send_job_webhook(job):
+    """POST the finished job to its webhook URL"""
+    import requests  # Imported lazily to keep startup fast
+
+    try:
+        # Checked again here: DNS may have changed since the job was queued
+        validate_webhook_url(job['webhook_url'])
+        response = requests.post(
+            job['webhook_url'], json=job_to_response(job), timeout=10, allow_redirects=False
+        )
+        response.raise_for_status()
+    except Exception as e:
+        logger.warning("Error sending webhook for job %s: %s", job['id'], e)
@@ -0,0 +1,98 @@
+import collections
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+from typing import Dict, NamedTuple, Optional
+
+from ..utils.config import (
+    ELEVENLABS_MODEL_ID,
+    ELEVENLABS_MULTILINGUAL_MODEL_ID,
+    TTS_ROUTES_PATH,
+    TTS_ROUTE_CACHE_SIZE
+)
+from ..utils.script_utils import detect_script
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VOICE_SETTINGS = {"stability": 0.5, "similarity_boost": 0.75}
+
+# Script -> model, preferred voice (None keeps the requested one) and voice settings.
+# Only plain Latin text goes to the English-only model.
+DEFAULT_ROUTES = {
+    "latin": {"model_id": ELEVENLABS_MODEL_ID},
+    "latin_extended": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "han": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "japanese": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "hangul": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "cyrillic": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "greek": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "arabic": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "hebrew": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "devanagari": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+    "thai": {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID},
+}
+
+
+class TtsRoute(NamedTuple):
+    script: str
+    language: Optional[str]
+    model_id: str
+    voice_id: Optional[str]
+    voice_settings: Dict
+
+
+@lru_cache(maxsize=None)
+def load_routes() -> Dict[str, Dict]:
+    """
+    The routing table: DEFAULT_ROUTES with per-script overrides from TTS_ROUTES_PATH, if it exists, e.g.
+    {"japanese": {"voice_id": "...", "voice_settings": {"stability": 0.6, "similarity_boost": 0.8}}}
+    """
+    routes = {script: dict(route) for script, route in DEFAULT_ROUTES.items()}
+    if os.path.exists(TTS_ROUTES_PATH):
+        try:
+            with open(TTS_ROUTES_PATH, "r", encoding="utf-8") as f:
+                overrides = json.load(f)
+            for script, route in overrides.items():
+                routes.setdefault(script, {"model_id": ELEVENLABS_MULTILINGUAL_MODEL_ID}).update(route)
+        except Exception as e:
+            logger.error("Error loading TTS routes from %s: %s", TTS_ROUTES_PATH, e)
+    return routes
+
+
+# Recent routes, keyed by a digest of the text so that long replies aren't kept in memory
+_route_cache = collections.OrderedDict()
+_route_cache_lock = threading.Lock()
+
+
+def route_text(text: str) -> TtsRoute:
+    """The model, preferred voice and voice settings for text, by its script; cached per text"""
+    key = hashlib.sha1(text.encode("utf-8")).digest()
+    with _route_cache_lock:
+        route = _route_cache.get(key)
+        if route is not None:
+            _route_cache.move_to_end(key)
+            return route
+
+    route = _route_for_script(*detect_script(text))
+
+    with _route_cache_lock:
+        _route_cache[key] = route
+        while len(_route_cache) > TTS_ROUTE_CACHE_SIZE:
+            _route_cache.popitem(last=False)
+    return route
+
+
+@lru_cache(maxsize=None)
+def _route_for_script(script: str, language: Optional[str]) -> TtsRoute:
+    routes = load_routes()
+    route = routes.get(script) or routes["latin"]
+    return TtsRoute(
+        script=script,
+        language=language,
+        model_id=route.get("model_id", ELEVENLABS_MULTILINGUAL_MODEL_ID),
+        voice_id=route.get("voice_id"),
+        voice_settings=route.get("voice_settings", DEFAULT_VOICE_SETTINGS)
+    )
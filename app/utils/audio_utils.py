@@ -1,33 +1,83 @@
+import logging
 import os
+import json
 import uuid
+import shutil
 import subprocess
-from fastapi import UploadFile
-import soundfile as sf
-from pydub import AudioSegment
+import tempfile
+from typing import List, Optional, TYPE_CHECKING
 
-from .config import UPLOADS_DIR, AUDIO_OUTPUT_DIR
+if TYPE_CHECKING:
+    from fastapi import UploadFile
 
-def save_upload_file(file: UploadFile):
-    """Save an uploaded file and return the file path"""
+from .config import (
+    UPLOADS_DIR,
+    AUDIO_OUTPUT_DIR,
+    MAX_UPLOAD_BYTES,
+    UPLOAD_CHUNK_SIZE,
+    MAX_AUDIO_DURATION_SECONDS,
+    ALLOWED_AUDIO_CODECS
+)
+from .profiling import traced
+
+logger = logging.getLogger(__name__)
+
+class UploadTooLargeError(ValueError):
+    """The upload is bigger than MAX_UPLOAD_BYTES"""
+
+class UnsupportedAudioError(ValueError):
+    """The upload isn't audio we accept (no audio stream, unsupported codec or too long)"""
+
+@traced("audio.save_upload_file")
+def save_upload_file(file: "UploadFile", max_bytes: int = MAX_UPLOAD_BYTES, hasher=None):
+    """
+    Save an uploaded file in fixed-size chunks and return the file path.
+    Raises UploadTooLargeError (and removes the partial file) as soon as max_bytes is exceeded.
+    If a hashlib hasher is given it is fed each chunk, so the content hash costs no extra pass.
+    """
     # Create a unique filename
     filename = f"{uuid.uuid4()}{os.path.splitext(file.filename or 'audio')[1]}"
     filepath = os.path.join(UPLOADS_DIR, filename)
     
-    # Save the file
-    with open(filepath, "wb") as f:
-        f.write(file.file.read())
+    # Save the file without holding more than one chunk in memory
+    written = 0
+    try:
+        with open(filepath, "wb") as f:
+            while True:
+                chunk = file.file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise UploadTooLargeError(f"File exceeds the maximum upload size of {max_bytes} bytes")
+                f.write(chunk)
+                if hasher is not None:
+                    hasher.update(chunk)
+    except Exception:
+        if os.path.exists(filepath):
+            os.remove(filepath)
+        raise
     
     return filepath
 
-def convert_webm_to_wav(webm_path):
-    """Convert a webm file to wav format"""
+@traced("audio.convert_webm_to_wav")
+def convert_webm_to_wav(webm_path, max_duration: float = MAX_AUDIO_DURATION_SECONDS):
+    """
+    Convert a webm file to wav format.
+    Only the first max_duration + 1 seconds are decoded, so memory stays bounded however long
+    the upload is; a result longer than max_duration means the upload was over the limit.
+    """
     # Create output wav filename
     wav_filename = f"{os.path.splitext(os.path.basename(webm_path))[0]}.wav"
     wav_path = os.path.join(UPLOADS_DIR, wav_filename)
+    # MediaRecorder webm has no duration in its header, so it can't be checked before decoding
+    duration_cap = max_duration + 1 if max_duration > 0 else None
     
     try:
-        # Convert using pydub
-        audio = AudioSegment.from_file(webm_path)
+        # Convert using pydub (imported lazily; it is slow to import)
+        from pydub import AudioSegment
+
+        audio = AudioSegment.from_file(webm_path, duration=duration_cap)
         audio.export(wav_path, format="wav")
         
         # Remove the original webm file
@@ -37,8 +87,9 @@ def convert_webm_to_wav(webm_path):
     except Exception as e:
         # Fallback to ffmpeg if pydub fails
         try:
+            duration_args = ["-t", str(duration_cap)] if duration_cap else []
             subprocess.run(
-                ["ffmpeg", "-i", webm_path, "-ar", "16000", wav_path],
+                ["ffmpeg", "-i", webm_path, "-ar", "16000", *duration_args, wav_path],
                 check=True
             )
             
@@ -47,14 +98,14 @@ def convert_webm_to_wav(webm_path):
             
             return wav_path
         except Exception as e:
-            print(f"Error converting webm to wav: {e}")
+            logger.error("Error converting webm to wav: %s", e)
             # Return original if conversion fails
             return webm_path
 
-def save_audio_response(audio_data):
+def save_audio_response(audio_data, extension="mp3"):
     """Save audio response from ElevenLabs and return the URL path"""
     # Create a unique filename
-    filename = f"{uuid.uuid4()}.mp3"
+    filename = f"{uuid.uuid4()}.{extension}"
     filepath = os.path.join(AUDIO_OUTPUT_DIR, filename)
     
     # Save the audio data
@@ -62,4 +113,131 @@ def save_audio_response(audio_data):
         f.write(audio_data)
     
     # Return the URL path
-    return f"/static/audio/{filename}"
\ No newline at end of file
+    return f"/static/audio/{filename}"
+
+@traced("audio.concat_audio_responses")
+def concat_audio_responses(audio_chunks: List[bytes]):
+    """
+    Join MP3 chunks in order into a single file and return the URL path.
+    Uses ffmpeg's concat demuxer with stream copy so the audio is not re-encoded.
+    """
+    if len(audio_chunks) == 1:
+        return save_audio_response(audio_chunks[0])
+
+    filename = f"{uuid.uuid4()}.mp3"
+
+    # Parts and the joined file are written to a private temp dir, not the publicly served output dir
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        filepath = os.path.join(tmp_dir, filename)
+        part_paths = []
+        for index, chunk in enumerate(audio_chunks):
+            part_path = os.path.join(tmp_dir, f"part_{index:04d}.mp3")
+            with open(part_path, "wb") as f:
+                f.write(chunk)
+            part_paths.append(part_path)
+
+        list_path = os.path.join(tmp_dir, "parts.txt")
+        with open(list_path, "w") as f:
+            for part_path in part_paths:
+                f.write(f"file '{os.path.abspath(part_path)}'\n")
+
+        try:
+            subprocess.run(
+                ["ffmpeg", "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                 "-i", list_path, "-c", "copy", filepath],
+                check=True
+            )
+        except Exception as e:
+            # Fallback to pydub if ffmpeg stream copy is unavailable
+            logger.warning("Error joining audio with ffmpeg, falling back to pydub: %s", e)
+            from pydub import AudioSegment
+
+            combined = AudioSegment.empty()
+            for part_path in part_paths:
+                combined += AudioSegment.from_file(part_path, format="mp3")
+            combined.export(filepath, format="mp3")
+
+        shutil.move(filepath, os.path.join(AUDIO_OUTPUT_DIR, filename))
+
+    return f"/static/audio/{filename}"
+
+# soundfile subtypes whose names differ from ffprobe's codec names
+SOUNDFILE_CODECS = {
+    "MPEG_LAYER_III": "mp3",
+    "FLOAT": "pcm_f32",
+    "DOUBLE": "pcm_f64",
+    "ULAW": "pcm_mulaw",
+    "ALAW": "pcm_alaw",
+}
+
+def probe_audio(file_path):
+    """
+    Read the duration and audio codec from the file header without decoding it.
+    Returns a dict with 'duration' (seconds) and 'codec', either of which may be None if unknown,
+    or None if the file couldn't be probed at all.
+    """
+    try:
+        # ffprobe only reads the container headers
+        result = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a",
+             "-show_entries", "format=duration:stream=codec_name",
+             "-of", "json", file_path],
+            capture_output=True, text=True, timeout=5, check=True
+        )
+        info = json.loads(result.stdout or "{}")
+        streams = info.get("streams") or []
+        duration = (info.get("format") or {}).get("duration")
+        return {
+            "duration": float(duration) if duration not in (None, "N/A") else None,
+            "codec": streams[0].get("codec_name") if streams else "",
+        }
+    except subprocess.CalledProcessError as e:
+        # ffprobe ran but couldn't parse the file, so it isn't readable audio
+        logger.debug("ffprobe rejected %s: %s", file_path, e.stderr)
+        return {"duration": None, "codec": ""}
+    except Exception as e:
+        logger.debug("ffprobe could not probe %s: %s", file_path, e)
+
+    try:
+        # soundfile reads the header of wav, flac, ogg and mp3 files when ffprobe is unavailable
+        import soundfile as sf
+
+        info = sf.info(file_path)
+        return {"duration": info.duration, "codec": SOUNDFILE_CODECS.get(info.subtype, info.subtype.lower())}
+    except Exception as e:
+        logger.debug("Could not probe %s: %s", file_path, e)
+        return None
+
+def get_audio_duration(file_path) -> Optional[float]:
+    """
+    Get the duration of an audio file in seconds from its header, or None if it can't be determined
+    """
+    probe = probe_audio(file_path)
+    return probe["duration"] if probe else None
+
+@traced("audio.validate_audio_file")
+def validate_audio_file(file_path, max_duration: float = MAX_AUDIO_DURATION_SECONDS):
+    """
+    Reject files with no audio stream, an unsupported codec, or a duration over max_duration,
+    using only a header probe. Files that can't be probed are let through.
+    Raises UnsupportedAudioError and removes the file when rejecting.
+    """
+    probe = probe_audio(file_path)
+    if probe is None:
+        return
+
+    error = None
+    if probe["codec"] == "":
+        error = "File contains no readable audio stream"
+    elif probe["codec"] and ALLOWED_AUDIO_CODECS and not _codec_allowed(probe["codec"]):
+        error = f"Unsupported audio codec: {probe['codec']}"
+    elif probe["duration"] is not None and max_duration > 0 and probe["duration"] > max_duration:
+        error = f"Audio is {probe['duration']:.0f} seconds long; the maximum is {max_duration:.0f} seconds"
+
+    if error:
+        os.remove(file_path)
+        raise UnsupportedAudioError(error)
+
+def _codec_allowed(codec):
+    # Codec families match by prefix, e.g. "pcm" allows pcm_s16le and "pcm_16" (soundfile's name)
+    return any(codec.startswith(allowed) for allowed in ALLOWED_AUDIO_CODECS)
\ No newline at end of file
@@ -0,0 +1,298 @@
+import collections
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from .config import (
+    CACHE_DB_PATH,
+    NEAR_CACHE_MAX_ENTRIES,
+    NEAR_CACHE_TTL,
+    CACHE_INVALIDATION_POLL_INTERVAL
+)
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class SharedCache:
+    """
+    Key-value cache shared by every worker process on the host.
+
+    Values live in a SQLite file (WAL mode, so readers don't block each other) and are
+    JSON-encoded. Each process keeps a small in-memory LRU in front of it; writes and
+    deletes append to an invalidation log that every process polls, at most once per
+    CACHE_INVALIDATION_POLL_INTERVAL, to drop stale near-cache entries.
+    """
+
+    def __init__(self, path: str = CACHE_DB_PATH, near_max_entries: int = NEAR_CACHE_MAX_ENTRIES,
+                 near_ttl: float = NEAR_CACHE_TTL, poll_interval: float = CACHE_INVALIDATION_POLL_INTERVAL):
+        self.path = path
+        self.near_max_entries = near_max_entries
+        self.near_ttl = near_ttl
+        self.poll_interval = poll_interval
+        self._near = collections.OrderedDict()
+        self._near_lock = threading.Lock()
+        self._local = threading.local()
+        self._last_seq = None
+        self._last_poll = 0.0
+        self._init_lock = threading.Lock()
+        self._initialized = False
+
+    # Connection handling
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            self._ensure_schema()
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    def _ensure_schema(self):
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            try:
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_entries (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        expires_at REAL
+                    )
+                """)
+                connection.execute("""
+                    CREATE TABLE IF NOT EXISTS cache_invalidations (
+                        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                        key TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                row = connection.execute("SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations").fetchone()
+                self._last_seq = row[0]
+            finally:
+                connection.close()
+            self._initialized = True
+
+    # Near cache
+
+    def _near_get(self, key):
+        self._poll_invalidations()
+        with self._near_lock:
+            entry = self._near.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._near[key]
+                return _MISSING
+            self._near.move_to_end(key)
+            return value
+
+    def _near_set(self, key, value, ttl):
+        if self.near_max_entries <= 0:
+            return
+        near_ttl = self.near_ttl if ttl is None else min(ttl, self.near_ttl)
+        with self._near_lock:
+            self._near[key] = (value, time.monotonic() + near_ttl)
+            self._near.move_to_end(key)
+            while len(self._near) > self.near_max_entries:
+                self._near.popitem(last=False)
+
+    def _near_drop(self, key):
+        with self._near_lock:
+            self._near.pop(key, None)
+
+    def _poll_invalidations(self):
+        now = time.monotonic()
+        if now - self._last_poll < self.poll_interval:
+            return
+        self._last_poll = now
+        try:
+            connection = self._connection()
+            rows = connection.execute(
+                "SELECT seq, key FROM cache_invalidations WHERE seq > ? ORDER BY seq",
+                (self._last_seq or 0,)
+            ).fetchall()
+        except Exception as e:
+            logger.warning("Error polling cache invalidations: %s", e)
+            return
+        if rows:
+            with self._near_lock:
+                for _, key in rows:
+                    self._near.pop(key, None)
+            self._last_seq = rows[-1][0]
+
+    def _broadcast(self, connection, key):
+        """Record an invalidation for the other processes; must run inside the write transaction"""
+        connection.execute(
+            "INSERT INTO cache_invalidations (key, created_at) VALUES (?, ?)",
+            (key, time.time())
+        )
+
+    # Public API
+
+    def get(self, key, default=None):
+        value = self._near_get(key)
+        if value is not _MISSING:
+            return value
+        try:
+            row = self._connection().execute(
+                "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+            ).fetchone()
+        except Exception as e:
+            logger.warning("Error reading cache key %s: %s", key, e)
+            return default
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return default
+        value = json.loads(row[0])
+        remaining = None if row[1] is None else row[1] - time.time()
+        self._near_set(key, value, remaining)
+        return value
+
+    def set(self, key, value, ttl=None):
+        """Store a value (ttl in seconds, None for no expiry) and invalidate other processes' copies"""
+        expires_at = None if ttl is None else time.time() + ttl
+        try:
+            connection = self._connection()
+            with _transaction(connection):
+                connection.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at)
+                )
+                self._broadcast(connection, key)
+        except Exception as e:
+            logger.warning("Error writing cache key %s: %s", key, e)
+            self._near_drop(key)
+            return False
+        self._near_set(key, value, ttl)
+        return True
+
+    def add(self, key, value, ttl=None):
+        """
+        Store a value only if the key is absent or expired; returns True if this call stored it.
+        Atomic across processes, so it can mark work as in flight.
+        """
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        try:
+            connection = self._connection()
+            with _transaction(connection):
+                cursor = connection.execute(
+                    """
+                    INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at
+                    WHERE cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?
+                    """,
+                    (key, json.dumps(value), expires_at, now)
+                )
+                added = cursor.rowcount > 0
+                if added:
+                    self._broadcast(connection, key)
+        except Exception as e:
+            logger.warning("Error adding cache key %s: %s", key, e)
+            return False
+        if added:
+            self._near_set(key, value, ttl)
+        return added
+
+    def delete(self, key):
+        try:
+            connection = self._connection()
+            with _transaction(connection):
+                connection.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._broadcast(connection, key)
+        except Exception as e:
+            logger.warning("Error deleting cache key %s: %s", key, e)
+        self._near_drop(key)
+
+    def incr(self, key, amount=1, ttl=None):
+        """Atomically add amount to a numeric value (starting from 0) and return the result"""
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        try:
+            connection = self._connection()
+            with _transaction(connection):
+                row = connection.execute(
+                    """
+                    INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?)
+                    ON CONFLICT(key) DO UPDATE SET
+                        value = CASE WHEN cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?
+                                     THEN excluded.value
+                                     ELSE CAST(cache_entries.value AS INTEGER) + ? END,
+                        expires_at = CASE WHEN cache_entries.expires_at IS NOT NULL AND cache_entries.expires_at <= ?
+                                          THEN excluded.expires_at
+                                          ELSE cache_entries.expires_at END
+                    RETURNING value
+                    """,
+                    (key, json.dumps(amount), expires_at, now, amount, now)
+                ).fetchone()
+                self._broadcast(connection, key)
+        except Exception as e:
+            logger.warning("Error incrementing cache key %s: %s", key, e)
+            return None
+        self._near_drop(key)
+        return int(row[0])
+
+    def get_or_set(self, key, factory, ttl=None):
+        """Return the cached value, or compute it with factory(), cache it and return it"""
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = factory()
+        self.set(key, value, ttl)
+        return value
+
+    def purge_expired(self, invalidation_max_age: float = 3600):
+        """Remove expired entries and old invalidation records"""
+        try:
+            connection = self._connection()
+            with _transaction(connection):
+                connection.execute(
+                    "DELETE FROM cache_entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (time.time(),)
+                )
+                connection.execute(
+                    "DELETE FROM cache_invalidations WHERE created_at <= ?", (time.time() - invalidation_max_age,)
+                )
+        except Exception as e:
+            logger.warning("Error purging cache: %s", e)
+
+
+class _transaction:
+    """BEGIN IMMEDIATE ... COMMIT on an autocommit connection, rolling back on error"""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        self.connection.execute("BEGIN IMMEDIATE")
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        self.connection.execute("ROLLBACK" if exc_type else "COMMIT")
+        return False
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache() -> SharedCache:
+    """The process-wide shared cache, created on first use"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = SharedCache()
+    return _shared_cache
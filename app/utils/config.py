@@ -1,19 +1,16 @@
+import logging
 import os
-import sys
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
+logger = logging.getLogger(__name__)
+
+# Settings are read from the environment when this module is imported; run.py loads .env
+# before importing the app (use `uvicorn --env-file .env` when starting uvicorn directly)
 
 # OpenAI API configuration
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    print("Warning: OPENAI_API_KEY environment variable not set")
 
 # ElevenLabs API configuration
 ELEVENLABS_API_KEY = os.environ.get("ELEVENLABS_API_KEY")
-if not ELEVENLABS_API_KEY:
-    print("Warning: ELEVENLABS_API_KEY environment variable not set")
 
 # Default voice ID for ElevenLabs (Rachel)
 DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
@@ -22,13 +19,141 @@ DEFAULT_VOICE_ID = "21m00Tcm4TlvDq8ikWAM"
 UPLOADS_DIR = "app/static/uploads"
 AUDIO_OUTPUT_DIR = "app/static/audio"
 
-# Ensure directories exist
-os.makedirs(UPLOADS_DIR, exist_ok=True)
-os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
-
 # API endpoints
-ELEVENLABS_API_URL = "https://api.elevenlabs.io/v1"
+ELEVENLABS_API_URL = os.environ.get("ELEVENLABS_API_URL", "https://api.elevenlabs.io/v1")
+
+# Models
+OPENAI_TRANSCRIPTION_MODEL = os.environ.get("OPENAI_TRANSCRIPTION_MODEL", "whisper-1")
+OPENAI_CHAT_MODEL = os.environ.get("OPENAI_CHAT_MODEL", "gpt-4-turbo")
+CHAT_DEFAULT_MAX_TOKENS = int(os.environ.get("CHAT_DEFAULT_MAX_TOKENS", "300"))
+ELEVENLABS_MODEL_ID = os.environ.get("ELEVENLABS_MODEL_ID", "eleven_monolingual_v1")
+ELEVENLABS_MULTILINGUAL_MODEL_ID = os.environ.get("ELEVENLABS_MULTILINGUAL_MODEL_ID", "eleven_multilingual_v2")
+
+# TTS routing: the script of the text picks the ElevenLabs model, preferred voice and voice settings.
+# Plain Latin text uses ELEVENLABS_MODEL_ID and everything else the multilingual model; per-script
+# overrides are read from TTS_ROUTES_PATH if it exists
+TTS_ROUTES_PATH = os.environ.get("TTS_ROUTES_PATH", "app/data/tts_routes.json")
+TTS_ROUTE_CACHE_SIZE = int(os.environ.get("TTS_ROUTE_CACHE_SIZE", "1024"))  # Texts whose route is remembered
+
+# Chat routing: short, simple messages go to the fast model with a small max_tokens;
+# the primary model (OPENAI_CHAT_MODEL) falls back to the fast model while its recent p95 latency is over budget
+CHAT_ROUTING_ENABLED = os.environ.get("CHAT_ROUTING_ENABLED", "true").lower() == "true"
+CHAT_FAST_MODEL = os.environ.get("CHAT_FAST_MODEL", "gpt-4o-mini")
+CHAT_SIMPLE_MAX_CHARS = int(os.environ.get("CHAT_SIMPLE_MAX_CHARS", "40"))
+CHAT_SIMPLE_MAX_TOKENS = int(os.environ.get("CHAT_SIMPLE_MAX_TOKENS", "80"))
+CHAT_COMPLEX_MAX_TOKENS = int(os.environ.get("CHAT_COMPLEX_MAX_TOKENS", "600"))
+CHAT_LATENCY_BUDGET_MS = int(os.environ.get("CHAT_LATENCY_BUDGET_MS", "4000"))
+CHAT_LATENCY_WINDOW = int(os.environ.get("CHAT_LATENCY_WINDOW", "50"))  # Recent calls per model and tier used for p95
+CHAT_LATENCY_SAMPLE_TTL = float(os.environ.get("CHAT_LATENCY_SAMPLE_TTL", "300"))  # Seconds a latency sample counts towards p95
+CHAT_PRIMARY_PROBE_RATE = float(os.environ.get("CHAT_PRIMARY_PROBE_RATE", "0.05"))  # Share of turns sent to the primary model while falling back
+
+# Providers: "openai", "local" or "fake" for transcription; "openai" or "fake" for chat; "elevenlabs" or "fake" for speech
+ASR_PROVIDER = os.environ.get("ASR_PROVIDER", "openai")
+CHAT_PROVIDER = os.environ.get("CHAT_PROVIDER", "openai")
+TTS_PROVIDER = os.environ.get("TTS_PROVIDER", "elevenlabs")
+
+# Routing: clips shorter than ASR_SHORT_CLIP_MAX_SECONDS go to ASR_SHORT_CLIP_PROVIDER (0 disables)
+ASR_SHORT_CLIP_PROVIDER = os.environ.get("ASR_SHORT_CLIP_PROVIDER", "local")
+ASR_SHORT_CLIP_MAX_SECONDS = float(os.environ.get("ASR_SHORT_CLIP_MAX_SECONDS", "0"))
+
+# On-host ASR engine (faster-whisper, optional dependency)
+LOCAL_ASR_MODEL = os.environ.get("LOCAL_ASR_MODEL", "base")
+LOCAL_ASR_DEVICE = os.environ.get("LOCAL_ASR_DEVICE", "cpu")
+LOCAL_ASR_COMPUTE_TYPE = os.environ.get("LOCAL_ASR_COMPUTE_TYPE", "int8")
+
+# Uploads: request bodies over the limit are cut off by middleware as they stream in (see app.main),
+# then files are written in UPLOAD_CHUNK_SIZE chunks and rejected once over MAX_UPLOAD_BYTES
+MAX_UPLOAD_BYTES = int(os.environ.get("MAX_UPLOAD_BYTES", str(25 * 1024 * 1024)))  # Whisper's file limit
+UPLOAD_CHUNK_SIZE = int(os.environ.get("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+MAX_BATCH_FILES = int(os.environ.get("MAX_BATCH_FILES", "20"))
+MAX_AUDIO_DURATION_SECONDS = float(os.environ.get("MAX_AUDIO_DURATION_SECONDS", "600"))  # 0 disables
+# Audio codec families accepted for transcription (empty to accept any)
+ALLOWED_AUDIO_CODECS = tuple(
+    codec.strip() for codec in
+    os.environ.get("ALLOWED_AUDIO_CODECS", "opus,vorbis,mp3,aac,alac,flac,pcm").split(",")
+    if codec.strip()
+)
+
+# Long-text TTS: texts longer than the threshold are split into chunks and synthesized concurrently
+TTS_LONG_TEXT_THRESHOLD = int(os.environ.get("TTS_LONG_TEXT_THRESHOLD", "800"))
+TTS_CHUNK_MAX_CHARS = int(os.environ.get("TTS_CHUNK_MAX_CHARS", "400"))
+TTS_MAX_CONCURRENCY = int(os.environ.get("TTS_MAX_CONCURRENCY", "4"))
+
+# Reply used when the chat model returns no content
+FALLBACK_CHAT_REPLY = "I'm sorry, I couldn't generate a response. Please try again."
+
+# Pre-synthesized phrases: manifest of fixed phrases per voice, synthesized at startup and served from disk
+PHRASE_CACHE_ENABLED = os.environ.get("PHRASE_CACHE_ENABLED", "true").lower() == "true"
+PHRASE_MANIFEST_PATH = os.environ.get("PHRASE_MANIFEST_PATH", "app/data/phrases.json")
+PHRASE_CACHE_DIR = os.path.join(AUDIO_OUTPUT_DIR, "phrases")
+PHRASE_REFRESH_INTERVAL = int(os.environ.get("PHRASE_REFRESH_INTERVAL", "3600"))  # Seconds between voice catalogue checks
+
+# Shared cache: a SQLite file shared by all worker processes, with an in-process LRU in front
+CACHE_DB_PATH = os.environ.get("CACHE_DB_PATH", "app/data/shared_cache.db")
+NEAR_CACHE_MAX_ENTRIES = int(os.environ.get("NEAR_CACHE_MAX_ENTRIES", "1024"))
+NEAR_CACHE_TTL = float(os.environ.get("NEAR_CACHE_TTL", "30"))  # Upper bound on in-process staleness
+CACHE_INVALIDATION_POLL_INTERVAL = float(os.environ.get("CACHE_INVALIDATION_POLL_INTERVAL", "0.5"))
+VOICES_CACHE_TTL = int(os.environ.get("VOICES_CACHE_TTL", "600"))
+STATS_CACHE_TTL = int(os.environ.get("STATS_CACHE_TTL", "10"))
+
+# Idempotency: results of /transcribe (by Idempotency-Key and audio hash) and /chat (by Idempotency-Key)
+# are replayed for retries; duplicates that arrive while the original is running wait for it
+IDEMPOTENCY_TTL = int(os.environ.get("IDEMPOTENCY_TTL", "3600"))
+IDEMPOTENCY_IN_FLIGHT_TTL = int(os.environ.get("IDEMPOTENCY_IN_FLIGHT_TTL", "300"))  # Frees keys held by crashed workers
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get("IDEMPOTENCY_WAIT_SECONDS", "60"))
+IDEMPOTENCY_POLL_INTERVAL = float(os.environ.get("IDEMPOTENCY_POLL_INTERVAL", "0.2"))
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+
+# Transcription job queue
+TRANSCRIPTION_WORKERS = int(os.environ.get("TRANSCRIPTION_WORKERS", "2"))
+TRANSCRIPTION_MAX_ATTEMPTS = int(os.environ.get("TRANSCRIPTION_MAX_ATTEMPTS", "3"))
+TRANSCRIPTION_JOB_LEASE_SECONDS = int(os.environ.get("TRANSCRIPTION_JOB_LEASE_SECONDS", "600"))  # Renewed every third of this while a job runs
+TRANSCRIPTION_RETRY_BASE_SECONDS = float(os.environ.get("TRANSCRIPTION_RETRY_BASE_SECONDS", "5"))
+TRANSCRIPTION_POLL_INTERVAL = float(os.environ.get("TRANSCRIPTION_POLL_INTERVAL", "2"))
+TRANSCRIPTION_JOB_RETENTION_DAYS = float(os.environ.get("TRANSCRIPTION_JOB_RETENTION_DAYS", "7"))  # Finished jobs are purged after this (0 disables)
+# Job webhooks must be https and resolve to public addresses; if set, the host must also be listed here
+WEBHOOK_ALLOWED_HOSTS = [host.strip().lower() for host in os.environ.get("WEBHOOK_ALLOWED_HOSTS", "").split(",") if host.strip()]
+
+# visitor_stats retention: visitors inactive for longer than VISITOR_RETENTION_DAYS (0 disables)
+# are moved to the archive database, keeping monthly totals in the main database
+VISITOR_RETENTION_DAYS = int(os.environ.get("VISITOR_RETENTION_DAYS", "180"))
+VISITOR_ARCHIVE_PATH = os.environ.get("VISITOR_ARCHIVE_PATH", "app/data/visitor_stats_archive.db")
+VISITOR_ARCHIVE_BATCH_SIZE = int(os.environ.get("VISITOR_ARCHIVE_BATCH_SIZE", "500"))
+DB_MAINTENANCE_INTERVAL = int(os.environ.get("DB_MAINTENANCE_INTERVAL", "3600"))  # Seconds between maintenance runs
+DB_INCREMENTAL_VACUUM_PAGES = int(os.environ.get("DB_INCREMENTAL_VACUUM_PAGES", "1000"))  # Free pages released per run
+
+# Logging
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json").lower()  # "json" or "text"
+LOG_DEBUG_SAMPLE_EVERY = int(os.environ.get("LOG_DEBUG_SAMPLE_EVERY", "1"))  # Keep 1 in N debug lines
+
+# Profiling: admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))  # Seconds between stack samples
+PROFILE_MAX_SECONDS = int(os.environ.get("PROFILE_MAX_SECONDS", "120"))
+PROFILE_MAX_STORED = int(os.environ.get("PROFILE_MAX_STORED", "50"))  # Per-request profiles kept in memory
+
+# HTTP caching and compression
+STATIC_CACHE_MAX_AGE = int(os.environ.get("STATIC_CACHE_MAX_AGE", "86400"))  # Seconds browsers may reuse /static files
+GZIP_MINIMUM_SIZE = int(os.environ.get("GZIP_MINIMUM_SIZE", "500"))  # Smaller API responses are sent uncompressed
+GZIP_COMPRESS_LEVEL = int(os.environ.get("GZIP_COMPRESS_LEVEL", "6"))
+
+# Startup budget (milliseconds) checked by bench_startup.py
+STARTUP_BUDGET_MS = int(os.environ.get("STARTUP_BUDGET_MS", "500"))
+
+
+def ensure_directories():
+    """Create the audio directories if they don't exist"""
+    os.makedirs(UPLOADS_DIR, exist_ok=True)
+    os.makedirs(AUDIO_OUTPUT_DIR, exist_ok=True)
+
+
+def report_config_status():
+    """Log warnings for missing configuration"""
+    if not OPENAI_API_KEY:
+        logger.warning("OPENAI_API_KEY environment variable not set")
+    if not ELEVENLABS_API_KEY:
+        logger.warning("ELEVENLABS_API_KEY environment variable not set")
 
-# Print debug information
-print(f"OPENAI_API_KEY set: {bool(OPENAI_API_KEY)}")
-print(f"ELEVENLABS_API_KEY set: {bool(ELEVENLABS_API_KEY)}")
\ No newline at end of file
+    logger.info("OPENAI_API_KEY set: %s", bool(OPENAI_API_KEY))
+    logger.info("ELEVENLABS_API_KEY set: %s", bool(ELEVENLABS_API_KEY))
\ No newline at end of file
@@ -1,8 +1,17 @@
+import hashlib
+import logging
 import os
 import sqlite3
-import sys
 from datetime import datetime
 
+from .cache_utils import get_shared_cache
+from .config import STATS_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Button counts are cached per visitor across worker processes; updates invalidate them
+BUTTON_COUNTS_CACHE_TTL = 3600
+
 # Get database path from environment variables or use default
 DATABASE_URL = os.environ.get('DATABASE_URL', 'app/data/visitor_stats.db')
 
@@ -15,11 +24,101 @@ def get_db_connection():
         connection.row_factory = sqlite3.Row  # This enables column access by name
         return connection
     except Exception as e:
-        print(f"Error connecting to the database: {e}", file=sys.stderr)
+        logger.error("Error connecting to the database: %s", e)
         return None
 
+def visitor_key(ip_address, device_info):
+    """
+    Compact fixed-width identity for a visitor: the first 16 bytes of a SHA-256 over
+    the IP address and the whitespace/case-normalized user agent
+    """
+    normalized_device = " ".join((device_info or "").split()).lower()
+    return hashlib.sha256(f"{ip_address}\n{normalized_device}".encode("utf-8")).digest()[:16]
+
+def _button_counts_cache_key(key):
+    return f"visitor:{key.hex()}:buttons"
+
+def _cache_button_counts(visitor):
+    """Cache a visitor's button counts, as just read from the table"""
+    get_shared_cache().set(
+        _button_counts_cache_key(visitor['visitor_key']),
+        {button: visitor[f"{button}_button_count"] for button in ('record', 'send', 'read')},
+        ttl=BUTTON_COUNTS_CACHE_TTL
+    )
+
+def _invalidate_button_counts(key):
+    """
+    Drop a visitor's cached counts after an update; the next check reads them from the table.
+    Writing the new counts instead could race: a slower worker would overwrite a newer count.
+    """
+    get_shared_cache().delete(_button_counts_cache_key(key))
+
+def migrate_visitor_keys(connection):
+    """
+    Add and backfill visitor_stats.visitor_key on databases created before it existed.
+    Rows that map to the same key are merged into the oldest one before the unique index is built.
+    """
+    cursor = connection.cursor()
+    columns = [row['name'] for row in cursor.execute("PRAGMA table_info(visitor_stats)")]
+    if 'visitor_key' not in columns:
+        logger.info("Adding visitor_key column to visitor_stats")
+        cursor.execute("ALTER TABLE visitor_stats ADD COLUMN visitor_key BLOB")
+
+    connection.create_function("visitor_key", 2, visitor_key, deterministic=True)
+    cursor.execute("""
+        UPDATE visitor_stats SET visitor_key = visitor_key(ip_address, device_info)
+        WHERE visitor_key IS NULL
+    """)
+    backfilled = cursor.rowcount
+
+    # New rows always get a key on insert, so duplicates can only come from a backfill
+    if backfilled > 0:
+        logger.info("Backfilled visitor_key for %d visitors", backfilled)
+        merge_duplicate_visitors(connection)
+
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_visitor_stats_key
+        ON visitor_stats (visitor_key)
+    """)
+
+def merge_duplicate_visitors(connection):
+    """Merge visitors with the same key (e.g. user agents differing only in whitespace or case) into the oldest row"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        UPDATE visitor_stats SET
+            visit_count = merged.visit_count,
+            record_button_count = merged.record_button_count,
+            send_button_count = merged.send_button_count,
+            read_button_count = merged.read_button_count,
+            first_visit_time = merged.first_visit_time,
+            last_visit_time = merged.last_visit_time
+        FROM (
+            SELECT
+                MIN(id) as id,
+                SUM(visit_count) as visit_count,
+                SUM(record_button_count) as record_button_count,
+                SUM(send_button_count) as send_button_count,
+                SUM(read_button_count) as read_button_count,
+                MIN(first_visit_time) as first_visit_time,
+                MAX(last_visit_time) as last_visit_time
+            FROM visitor_stats
+            GROUP BY visitor_key
+            HAVING COUNT(*) > 1
+        ) AS merged
+        WHERE visitor_stats.id = merged.id
+    """)
+    cursor.execute("""
+        DELETE FROM visitor_stats
+        WHERE id NOT IN (SELECT MIN(id) FROM visitor_stats GROUP BY visitor_key)
+    """)
+    if cursor.rowcount > 0:
+        logger.info("Merged %d duplicate visitors", cursor.rowcount)
+
 def init_db():
     """Initialize the database with required tables"""
+    # Imported here because job_utils builds on this module's connection helper
+    from .job_utils import init_job_table
+
     connection = get_db_connection()
     if not connection:
         return False
@@ -30,6 +129,7 @@ def init_db():
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS visitor_stats (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    visitor_key BLOB,
                     ip_address TEXT NOT NULL,
                     device_info TEXT,
                     visit_count INTEGER DEFAULT 1,
@@ -40,65 +140,66 @@ def init_db():
                     last_visit_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                 )
             """)
+            migrate_visitor_keys(connection)
+            # Lets retention find inactive visitors without a full scan
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_visitor_stats_last_visit
+                ON visitor_stats (last_visit_time)
+            """)
+            # Totals of visitors moved to the archive, per month of their last visit
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS visitor_stats_rollup (
+                    period TEXT PRIMARY KEY,
+                    visitors INTEGER DEFAULT 0,
+                    visits INTEGER DEFAULT 0,
+                    record_uses INTEGER DEFAULT 0,
+                    send_uses INTEGER DEFAULT 0,
+                    read_uses INTEGER DEFAULT 0
+                )
+            """)
+            init_job_table(connection)
             connection.commit()
             return True
     except Exception as e:
-        print(f"Error initializing database: {e}", file=sys.stderr)
+        logger.error("Error initializing database: %s", e)
         return False
     finally:
         connection.close()
 
 def get_visitor_stats(ip_address, device_info):
-    """Get visitor stats based on IP address and device info"""
-    print(f"[DB] Getting stats for visitor: {ip_address}, {device_info}", file=sys.stderr)
+    """Get visitor stats based on IP address and device info, recording a visit"""
+    logger.debug("Getting stats for visitor: %s, %s", ip_address, device_info)
     connection = get_db_connection()
     if not connection:
-        print("[DB] Failed to get database connection", file=sys.stderr)
+        logger.error("Failed to get database connection")
         return None
     
     try:
         with connection:
             cursor = connection.cursor()
-            # Check if the visitor exists
+            # Create the visitor or count another visit in a single statement
             cursor.execute(
-                "SELECT * FROM visitor_stats WHERE ip_address = ? AND device_info = ?",
-                (ip_address, device_info)
+                """
+                INSERT INTO visitor_stats 
+                (visitor_key, ip_address, device_info) 
+                VALUES (?, ?, ?) 
+                ON CONFLICT(visitor_key) DO UPDATE SET
+                    visit_count = visit_count + 1,
+                    last_visit_time = CURRENT_TIMESTAMP
+                RETURNING *
+                """,
+                (visitor_key(ip_address, device_info), ip_address, device_info)
             )
-            visitor = cursor.fetchone()
-            
-            if visitor:
-                print(f"[DB] Existing visitor found: {visitor['id']}", file=sys.stderr)
-                # Update the visitor stats
-                cursor.execute(
-                    """
-                    UPDATE visitor_stats 
-                    SET visit_count = visit_count + 1, 
-                        last_visit_time = CURRENT_TIMESTAMP 
-                    WHERE id = ? 
-                    RETURNING *
-                    """,
-                    (visitor['id'],)
-                )
-                result = cursor.fetchone()
-                print(f"[DB] Updated visitor stats: visit_count={result['visit_count']}", file=sys.stderr)
-                return dict(result)
-            else:
-                print(f"[DB] Creating new visitor record", file=sys.stderr)
-                # Create a new visitor record
-                cursor.execute(
-                    """
-                    INSERT INTO visitor_stats 
-                    (ip_address, device_info) 
-                    VALUES (?, ?) 
-                    RETURNING *
-                    """,
-                    (ip_address, device_info)
-                )
-                result = cursor.fetchone()
-                print(f"[DB] Created new visitor with id={result['id']}", file=sys.stderr)
-                return dict(result)
+            result = cursor.fetchone()
+        # Invalidated only once the transaction has committed
+        _invalidate_button_counts(result['visitor_key'])
+        if result['visit_count'] == 1:
+            logger.info("Created new visitor with id=%s", result['id'])
+        else:
+            logger.debug("Updated visitor stats: id=%s, visit_count=%s", result['id'], result['visit_count'])
+        return dict(result)
     except Exception as e:
-        print(f"Error getting visitor stats: {e}", file=sys.stderr)
+        logger.error("Error getting visitor stats: %s", e)
         return None
     finally:
         connection.close()
@@ -117,20 +218,22 @@ def increment_button_count(ip_address, device_info, button_type):
     try:
         with connection:
             cursor = connection.cursor()
-            # Update the visitor button count
+            # Update the visitor button count; visitors that aren't tracked yet are left alone
             cursor.execute(
                 f"""
                 UPDATE visitor_stats 
                 SET {column_name} = {column_name} + 1 
-                WHERE ip_address = ? AND device_info = ? 
+                WHERE visitor_key = ? 
                 RETURNING *
                 """,
-                (ip_address, device_info)
+                (visitor_key(ip_address, device_info),)
             )
             visitor = cursor.fetchone()
-            return dict(visitor) if visitor else None
+        if visitor:
+            _invalidate_button_counts(visitor['visitor_key'])
+        return dict(visitor) if visitor else None
     except Exception as e:
-        print(f"Error incrementing button count: {e}", file=sys.stderr)
+        logger.error("Error incrementing button count: %s", e)
         return False
     finally:
         connection.close()
@@ -140,6 +243,17 @@ def check_button_usage(ip_address, device_info, button_type):
     if button_type not in ['record', 'send', 'read']:
         return {'allowed': False, 'remaining': 0}
     
+    key = visitor_key(ip_address, device_info)
+
+    # Counts are cached until the next update, so most checks don't touch the table
+    cached_counts = get_shared_cache().get(_button_counts_cache_key(key))
+    if cached_counts is not None:
+        remaining = 10 - cached_counts[button_type]
+        return {
+            'allowed': cached_counts[button_type] < 10,
+            'remaining': remaining if remaining > 0 else 0
+        }
+    
     connection = get_db_connection()
     if not connection:
         return {'allowed': True, 'remaining': 10}  # Fallback to allowing usage if DB issue
@@ -149,17 +263,15 @@ def check_button_usage(ip_address, device_info, button_type):
     try:
         with connection:
             cursor = connection.cursor()
-            # Get the current count
+            # Get the current counts
             cursor.execute(
-                f"""
-                SELECT {column_name} FROM visitor_stats 
-                WHERE ip_address = ? AND device_info = ?
-                """,
-                (ip_address, device_info)
+                "SELECT * FROM visitor_stats WHERE visitor_key = ?",
+                (key,)
             )
             result = cursor.fetchone()
             
             if result:
+                _cache_button_counts(result)
                 count = result[column_name]
                 remaining = 10 - count
                 return {
@@ -170,13 +282,16 @@ def check_button_usage(ip_address, device_info, button_type):
                 # No visitor record yet, so full usage allowed
                 return {'allowed': True, 'remaining': 10}
     except Exception as e:
-        print(f"Error checking button usage: {e}", file=sys.stderr)
+        logger.error("Error checking button usage: %s", e)
         return {'allowed': True, 'remaining': 10}  # Fallback to allowing usage if error
     finally:
         connection.close()
 
 def get_total_visitors():
-    """Get total unique visitors count"""
+    """Get total unique visitors count, including archived visitors (cached across workers for STATS_CACHE_TTL)"""
+    return get_shared_cache().get_or_set("stats:total_visitors", _query_total_visitors, ttl=STATS_CACHE_TTL)
+
+def _query_total_visitors():
     connection = get_db_connection()
     if not connection:
         return 0
@@ -184,17 +299,23 @@ def get_total_visitors():
     try:
         with connection:
             cursor = connection.cursor()
-            cursor.execute("SELECT COUNT(*) FROM visitor_stats")
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM visitor_stats)
+                     + (SELECT COALESCE(SUM(visitors), 0) FROM visitor_stats_rollup)
+            """)
             result = cursor.fetchone()
             return result[0] if result else 0
     except Exception as e:
-        print(f"Error getting total visitors: {e}", file=sys.stderr)
+        logger.error("Error getting total visitors: %s", e)
         return 0
     finally:
         connection.close()
 
 def get_usage_stats():
-    """Get aggregate usage statistics"""
+    """Get aggregate usage statistics, including archived visitors (cached across workers for STATS_CACHE_TTL)"""
+    return get_shared_cache().get_or_set("stats:usage", _query_usage_stats, ttl=STATS_CACHE_TTL)
+
+def _query_usage_stats():
     connection = get_db_connection()
     if not connection:
         return {
@@ -210,12 +331,28 @@ def get_usage_stats():
             cursor = connection.cursor()
             cursor.execute("""
                 SELECT 
-                    COUNT(*) as total_visitors,
-                    SUM(visit_count) as total_visits,
-                    SUM(record_button_count) as total_record_uses,
-                    SUM(send_button_count) as total_send_uses,
-                    SUM(read_button_count) as total_read_uses
-                FROM visitor_stats
+                    live.visitors + archived.visitors as total_visitors,
+                    live.visits + archived.visits as total_visits,
+                    live.record_uses + archived.record_uses as total_record_uses,
+                    live.send_uses + archived.send_uses as total_send_uses,
+                    live.read_uses + archived.read_uses as total_read_uses
+                FROM (
+                    SELECT
+                        COUNT(*) as visitors,
+                        COALESCE(SUM(visit_count), 0) as visits,
+                        COALESCE(SUM(record_button_count), 0) as record_uses,
+                        COALESCE(SUM(send_button_count), 0) as send_uses,
+                        COALESCE(SUM(read_button_count), 0) as read_uses
+                    FROM visitor_stats
+                ) live, (
+                    SELECT
+                        COALESCE(SUM(visitors), 0) as visitors,
+                        COALESCE(SUM(visits), 0) as visits,
+                        COALESCE(SUM(record_uses), 0) as record_uses,
+                        COALESCE(SUM(send_uses), 0) as send_uses,
+                        COALESCE(SUM(read_uses), 0) as read_uses
+                    FROM visitor_stats_rollup
+                ) archived
             """)
             row = cursor.fetchone()
             
@@ -237,7 +374,7 @@ def get_usage_stats():
                 }
             return stats
     except Exception as e:
-        print(f"Error getting usage stats: {e}", file=sys.stderr)
+        logger.error("Error getting usage stats: %s", e)
         return {
             'total_visitors': 0,
             'total_visits': 0,
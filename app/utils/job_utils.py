@@ -0,0 +1,291 @@
+import logging
+import time
+import uuid
+
+from .config import TRANSCRIPTION_JOB_RETENTION_DAYS
+from .db_utils import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ('queued', 'processing', 'completed', 'failed')
+
+
+def init_job_table(connection):
+    """Create the transcription_jobs table on an open connection"""
+    cursor = connection.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS transcription_jobs (
+            id TEXT PRIMARY KEY,
+            batch_id TEXT NOT NULL,
+            filename TEXT,
+            file_path TEXT NOT NULL,
+            webhook_url TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            attempts INTEGER DEFAULT 0,
+            text TEXT,
+            error TEXT,
+            available_at REAL NOT NULL,
+            lease_expires_at REAL,
+            lease_owner TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transcription_jobs_claim
+        ON transcription_jobs (status, available_at)
+    """)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_transcription_jobs_batch
+        ON transcription_jobs (batch_id)
+    """)
+
+
+def create_jobs(files, webhook_url=None):
+    """
+    Queue a batch of transcription jobs
+    files is a list of (file_path, filename) tuples; returns the created jobs
+    """
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    batch_id = uuid.uuid4().hex
+    now = time.time()
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            jobs = []
+            for file_path, filename in files:
+                cursor.execute(
+                    """
+                    INSERT INTO transcription_jobs
+                    (id, batch_id, filename, file_path, webhook_url, available_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    RETURNING *
+                    """,
+                    (uuid.uuid4().hex, batch_id, filename, file_path, webhook_url, now)
+                )
+                jobs.append(dict(cursor.fetchone()))
+            return jobs
+    except Exception as e:
+        logger.error("Error creating transcription jobs: %s", e)
+        return None
+    finally:
+        connection.close()
+
+
+def claim_next_job(lease_seconds):
+    """
+    Atomically claim the next runnable job and return it, or None if there is none.
+    Jobs left in 'processing' by a crashed worker become claimable again once their lease expires.
+    The returned job's lease_owner is a fresh token that the claimant passes to renew_lease and
+    to complete_job/fail_job; it stops matching as soon as another worker reclaims the job.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    now = time.time()
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                UPDATE transcription_jobs
+                SET status = 'processing',
+                    attempts = attempts + 1,
+                    lease_expires_at = ?,
+                    lease_owner = ?,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = (
+                    SELECT id FROM transcription_jobs
+                    WHERE (status = 'queued' AND available_at <= ?)
+                       OR (status = 'processing' AND lease_expires_at <= ?)
+                    ORDER BY available_at
+                    LIMIT 1
+                )
+                RETURNING *
+                """,
+                (now + lease_seconds, uuid.uuid4().hex, now, now)
+            )
+            job = cursor.fetchone()
+            return dict(job) if job else None
+    except Exception as e:
+        logger.error("Error claiming transcription job: %s", e)
+        return None
+    finally:
+        connection.close()
+
+
+def renew_lease(job_id, owner, lease_seconds):
+    """Extend a held lease; returns False if the job is no longer leased to owner"""
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                UPDATE transcription_jobs
+                SET lease_expires_at = ?
+                WHERE id = ? AND lease_owner = ? AND status = 'processing'
+                """,
+                (time.time() + lease_seconds, job_id, owner)
+            )
+            return cursor.rowcount > 0
+    except Exception as e:
+        logger.error("Error renewing transcription job lease: %s", e)
+        return False
+    finally:
+        connection.close()
+
+
+def complete_job(job_id, owner, text):
+    """Mark a job as completed with its transcription; returns None if owner no longer holds the lease"""
+    return _finish_job(job_id, owner, 'completed', text=text)
+
+
+def fail_job(job_id, owner, error, retry_in=None):
+    """
+    Record a job failure
+    If retry_in (seconds) is given the job is queued again after that delay, otherwise it is failed for good.
+    Returns None if owner no longer holds the lease.
+    """
+    if retry_in is None:
+        return _finish_job(job_id, owner, 'failed', error=error)
+
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                UPDATE transcription_jobs
+                SET status = 'queued',
+                    error = ?,
+                    available_at = ?,
+                    lease_expires_at = NULL,
+                    lease_owner = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ?
+                RETURNING *
+                """,
+                (error, time.time() + retry_in, job_id, owner)
+            )
+            job = cursor.fetchone()
+            return dict(job) if job else None
+    except Exception as e:
+        logger.error("Error requeuing transcription job: %s", e)
+        return None
+    finally:
+        connection.close()
+
+
+def _finish_job(job_id, owner, status, text=None, error=None):
+    """Move a job to a terminal status, if owner still holds its lease"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                UPDATE transcription_jobs
+                SET status = ?,
+                    text = ?,
+                    error = ?,
+                    lease_expires_at = NULL,
+                    lease_owner = NULL,
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE id = ? AND lease_owner = ?
+                RETURNING *
+                """,
+                (status, text, error, job_id, owner)
+            )
+            job = cursor.fetchone()
+            return dict(job) if job else None
+    except Exception as e:
+        logger.error("Error finishing transcription job: %s", e)
+        return None
+    finally:
+        connection.close()
+
+
+def get_job(job_id):
+    """Get a single job by id"""
+    connection = get_db_connection()
+    if not connection:
+        return None
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute("SELECT * FROM transcription_jobs WHERE id = ?", (job_id,))
+            job = cursor.fetchone()
+            return dict(job) if job else None
+    except Exception as e:
+        logger.error("Error getting transcription job: %s", e)
+        return None
+    finally:
+        connection.close()
+
+
+def get_batch_jobs(batch_id):
+    """Get all jobs in a batch, in submission order"""
+    connection = get_db_connection()
+    if not connection:
+        return []
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                "SELECT * FROM transcription_jobs WHERE batch_id = ? ORDER BY created_at, rowid",
+                (batch_id,)
+            )
+            return [dict(job) for job in cursor.fetchall()]
+    except Exception as e:
+        logger.error("Error getting transcription batch: %s", e)
+        return []
+    finally:
+        connection.close()
+
+
+def purge_finished_jobs(retention_days=TRANSCRIPTION_JOB_RETENTION_DAYS):
+    """Delete completed and failed jobs last updated more than retention_days ago; returns the number deleted"""
+    if retention_days <= 0:
+        return 0
+
+    connection = get_db_connection()
+    if not connection:
+        return 0
+
+    try:
+        with connection:
+            cursor = connection.cursor()
+            cursor.execute(
+                """
+                DELETE FROM transcription_jobs
+                WHERE status IN ('completed', 'failed')
+                  AND updated_at < datetime(?, 'unixepoch')
+                """,
+                (time.time() - retention_days * 86400,)
+            )
+            if cursor.rowcount:
+                logger.info("Purged %d finished transcription jobs", cursor.rowcount)
+            return cursor.rowcount
+    except Exception as e:
+        logger.error("Error purging transcription jobs: %s", e)
+        return 0
+    finally:
+        connection.close()
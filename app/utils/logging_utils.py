@@ -0,0 +1,117 @@
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from .config import LOG_LEVEL, LOG_FORMAT, LOG_DEBUG_SAMPLE_EVERY
+
+# Request id of the request being handled, set by the request-id middleware
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes present on every LogRecord; anything else was passed through `extra`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "sample_every"}
+
+_listener = None
+_setup_lock = threading.Lock()
+
+
+class RequestIdFilter(logging.Filter):
+    """Attach the current request id to every record"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only every Nth occurrence of a high-volume message.
+    DEBUG records are sampled at LOG_DEBUG_SAMPLE_EVERY by default; any record can
+    set its own rate with extra={"sample_every": N}. Counting is per message template.
+    """
+
+    def __init__(self, default_every: int = 1):
+        super().__init__()
+        self.default_every = max(1, default_every)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        every = getattr(record, "sample_every", None)
+        if every is None:
+            every = self.default_every if record.levelno <= logging.DEBUG else 1
+        if every <= 1:
+            return True
+
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """Format records as single-line JSON objects"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def setup_logging():
+    """
+    Route application logs through a queue to a background thread, so that
+    formatting and writing to stderr never happen on the request path.
+    Safe to call more than once.
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        stream_handler = logging.StreamHandler(sys.stderr)
+        if LOG_FORMAT == "json":
+            stream_handler.setFormatter(JsonFormatter())
+        else:
+            stream_handler.setFormatter(logging.Formatter(
+                "%(asctime)s %(levelname)s [%(name)s] [%(request_id)s] %(message)s"
+            ))
+
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # Filters run in the calling thread, where the request id context is available
+        queue_handler.addFilter(RequestIdFilter())
+        queue_handler.addFilter(SamplingFilter(LOG_DEBUG_SAMPLE_EVERY))
+
+        app_logger = logging.getLogger("app")
+        app_logger.setLevel(LOG_LEVEL)
+        app_logger.handlers = [queue_handler]
+        app_logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background logging thread"""
+    global _listener
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
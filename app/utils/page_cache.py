@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import logging
+import threading
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.staticfiles import StaticFiles
+
+from .config import STATIC_CACHE_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+# Preferred encodings, best first
+ENCODINGS = ("br", "gzip", "identity")
+
+
+def _brotli_compress(body: bytes):
+    """Brotli-compress body, or return None when the optional brotli package isn't installed"""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(body, quality=11)
+
+
+def choose_encoding(accept_encoding: str, available) -> str:
+    """Pick the best available encoding the client accepts (q-values honoured, q=0 excluded)"""
+    accepted = {}
+    for part in (accept_encoding or "").split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name] = q
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = "identity", 0.0
+    for encoding in ENCODINGS:
+        if encoding not in available or encoding == "identity":
+            continue
+        q = accepted.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class PrecompressedPage:
+    """
+    A page held in memory with its gzip (and, if brotli is installed, brotli) variants,
+    so each hit is a negotiation and a memory copy rather than a render and a compression
+    """
+
+    def __init__(self, body: bytes, media_type: str = "text/html; charset=utf-8", cache_control: str = "no-cache"):
+        self.media_type = media_type
+        self.cache_control = cache_control
+        self.variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=9, mtime=0)}
+        compressed = _brotli_compress(body)
+        if compressed is not None:
+            self.variants["br"] = compressed
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        # Strong ETags must differ per representation
+        self.etags = {encoding: f'"{digest}-{encoding}"' for encoding in self.variants}
+
+    def response(self, request: Request) -> Response:
+        encoding = choose_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        headers = {
+            "ETag": self.etags[encoding],
+            "Cache-Control": self.cache_control,
+            "Vary": "Accept-Encoding",
+        }
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self._matches(if_none_match):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+    def _matches(self, if_none_match: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return not tags.isdisjoint(self.etags.values())
+
+
+def render_template(name: str) -> bytes:
+    """Render a Jinja2 template that has no per-request data"""
+    from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+    environment = Environment(loader=FileSystemLoader("app/templates"), autoescape=select_autoescape())
+    return environment.get_template(name).render().encode("utf-8")
+
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+# Pages served from memory: name -> loader
+PAGE_SOURCES = {
+    "index": lambda: render_template("index.html"),
+    "test": lambda: read_file("app/static/test.html"),
+}
+
+_pages = {}
+_pages_lock = threading.Lock()
+
+
+def load_pages():
+    """Render and compress every page"""
+    with _pages_lock:
+        for name, source in PAGE_SOURCES.items():
+            _pages[name] = PrecompressedPage(source())
+    logger.debug("Loaded %d precompressed pages", len(_pages))
+
+
+def preload_pages():
+    """Load the pages in a background thread at startup, so importing Jinja2 doesn't delay readiness"""
+    threading.Thread(target=load_pages, name="page-preload", daemon=True).start()
+
+
+def get_page(name: str) -> PrecompressedPage:
+    """A loaded page, built on first use if startup didn't load it"""
+    page = _pages.get(name)
+    if page is None:
+        with _pages_lock:
+            page = _pages.get(name)
+            if page is None:
+                page = _pages[name] = PrecompressedPage(PAGE_SOURCES[name]())
+    return page
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles with a Cache-Control max-age; ETag/Last-Modified revalidation comes from StaticFiles"""
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers.setdefault("Cache-Control", f"public, max-age={STATIC_CACHE_MAX_AGE}")
+        return response
@@ -0,0 +1,244 @@
+import collections
+import functools
+import logging
+import sys
+import threading
+import time
+import tracemalloc
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional, Set
+
+from .config import PROFILE_SAMPLE_INTERVAL, PROFILE_MAX_STORED
+
+logger = logging.getLogger(__name__)
+
+# Profile of the current request, set when the request asked for profiling
+current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("current_profile", default=None)
+
+
+class StackSampler:
+    """
+    Sampling CPU profiler: a background thread records the stack of every other thread
+    each interval, or only of the threads returned by thread_filter when one is given.
+    Results are in folded-stack format ("frame;frame;frame count"), which flamegraph.pl,
+    speedscope and similar tools read directly.
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL,
+                 thread_filter: Optional[Callable[[], Set[int]]] = None):
+        self.interval = interval
+        self.thread_filter = thread_filter
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.is_set():
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            wanted = self.thread_filter() if self.thread_filter is not None else None
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id or (wanted is not None and thread_id not in wanted):
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.counts[";".join(reversed(stack))] += 1
+            self.samples += 1
+            self._stop.wait(self.interval)
+
+    def folded(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in self.counts.most_common())
+
+
+class RequestProfile:
+    """
+    CPU samples and timed sections collected while handling one request.
+    Only threads inside one of the request's @traced sections are sampled, so other
+    requests running at the same time don't show up in its stacks.
+    """
+
+    def __init__(self, request_id: str, path: str):
+        self.request_id = request_id
+        self.path = path
+        self._active_threads = collections.Counter()
+        self._threads_lock = threading.Lock()
+        self.sampler = StackSampler(thread_filter=self.active_threads)
+        self.sections: List[Dict] = []
+        self.started = time.perf_counter()
+        self.duration_ms = None
+
+    def active_threads(self) -> Set[int]:
+        with self._threads_lock:
+            return set(self._active_threads)
+
+    def enter_thread(self):
+        with self._threads_lock:
+            self._active_threads[threading.get_ident()] += 1
+
+    def exit_thread(self):
+        thread_id = threading.get_ident()
+        with self._threads_lock:
+            self._active_threads[thread_id] -= 1
+            if self._active_threads[thread_id] <= 0:
+                del self._active_threads[thread_id]
+
+    def start(self):
+        self.sampler.start()
+
+    def stop(self):
+        self.sampler.stop()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+
+    def to_dict(self):
+        return {
+            "request_id": self.request_id,
+            "path": self.path,
+            "duration_ms": self.duration_ms,
+            "samples": self.sampler.samples,
+            "sections": self.sections,
+            "folded": self.sampler.folded(),
+        }
+
+
+# Recent request profiles, by request id
+_profiles = collections.OrderedDict()
+_profiles_lock = threading.Lock()
+
+
+def store_profile(profile: RequestProfile):
+    with _profiles_lock:
+        _profiles[profile.request_id] = profile
+        while len(_profiles) > PROFILE_MAX_STORED:
+            _profiles.popitem(last=False)
+
+
+def get_profile(request_id: str) -> Optional[RequestProfile]:
+    with _profiles_lock:
+        return _profiles.get(request_id)
+
+
+def list_profiles():
+    with _profiles_lock:
+        return [
+            {"request_id": p.request_id, "path": p.path, "duration_ms": p.duration_ms}
+            for p in _profiles.values()
+        ]
+
+
+def traced(name: str):
+    """
+    Record the wall time of the decorated function in the current request's profile.
+    Costs a single context variable lookup when the request isn't being profiled.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = current_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            profile.enter_thread()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profile.exit_thread()
+                profile.sections.append({
+                    "name": name,
+                    "thread": threading.current_thread().name,
+                    "offset_ms": round((start - profile.started) * 1000, 3),
+                    "duration_ms": round((time.perf_counter() - start) * 1000, 3),
+                })
+        return wrapper
+    return decorator
+
+
+# Allocation tracing
+
+_baseline = None
+_tracemalloc_lock = threading.Lock()
+
+
+def start_tracemalloc(frames: int = 10):
+    """Start tracing allocations; returns False if already tracing"""
+    if tracemalloc.is_tracing():
+        return False
+    tracemalloc.start(frames)
+    return True
+
+
+def stop_tracemalloc():
+    global _baseline
+    with _tracemalloc_lock:
+        _baseline = None
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def _format_stats(stats, limit):
+    return [
+        {
+            "location": str(stat.traceback[0]) if stat.traceback else "?",
+            "traceback": stat.traceback.format() if len(stat.traceback) > 1 else None,
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(getattr(stat, "size_diff", 0) / 1024, 1),
+            "count": stat.count,
+            "count_diff": getattr(stat, "count_diff", 0),
+        }
+        for stat in stats[:limit]
+    ]
+
+
+def _filtered_snapshot():
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def snapshot_top(limit: int = 20, group_by: str = "lineno"):
+    """
+    Take a snapshot, make it the baseline for diffs, and return the top allocators
+    """
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise ValueError("Allocation tracing is not running")
+    snapshot = _filtered_snapshot()
+    with _tracemalloc_lock:
+        _baseline = snapshot
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "traced_kb": round(current / 1024, 1),
+        "peak_kb": round(peak / 1024, 1),
+        "top": _format_stats(snapshot.statistics(group_by), limit),
+    }
+
+
+def snapshot_diff(limit: int = 20, group_by: str = "lineno"):
+    """
+    Compare a new snapshot with the baseline and return the largest growth.
+    The new snapshot becomes the baseline for the next diff.
+    """
+    global _baseline
+    if not tracemalloc.is_tracing():
+        raise ValueError("Allocation tracing is not running")
+    snapshot = _filtered_snapshot()
+    with _tracemalloc_lock:
+        baseline, _baseline = _baseline, snapshot
+    if baseline is None:
+        raise ValueError("No baseline snapshot; take a snapshot first")
+    return {"top": _format_stats(snapshot.compare_to(baseline, group_by), limit)}
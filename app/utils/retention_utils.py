@@ -0,0 +1,146 @@
+import logging
+
+from .config import (
+    VISITOR_RETENTION_DAYS,
+    VISITOR_ARCHIVE_PATH,
+    VISITOR_ARCHIVE_BATCH_SIZE,
+    DB_INCREMENTAL_VACUUM_PAGES
+)
+from .db_utils import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+VISITOR_COLUMNS = (
+    "id, ip_address, device_info, visit_count, record_button_count, "
+    "send_button_count, read_button_count, first_visit_time, last_visit_time"
+)
+
+
+def archive_inactive_visitors(retention_days=VISITOR_RETENTION_DAYS, archive_path=VISITOR_ARCHIVE_PATH,
+                              batch_size=VISITOR_ARCHIVE_BATCH_SIZE):
+    """
+    Move visitors whose last visit is older than retention_days into the archive database,
+    adding their counts to visitor_stats_rollup. Works in small batches so each write
+    transaction is short. Returns the number of visitors archived.
+    """
+    if retention_days <= 0:
+        return 0
+
+    connection = get_db_connection()
+    if not connection:
+        return 0
+
+    archived = 0
+    stale = f"""
+        SELECT id FROM visitor_stats
+        WHERE last_visit_time < datetime('now', '-{int(retention_days)} days')
+        ORDER BY id
+        LIMIT {int(batch_size)}
+    """
+
+    try:
+        connection.execute("ATTACH DATABASE ? AS archive", (archive_path,))
+        connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS archive.visitor_stats_archive (
+                id INTEGER PRIMARY KEY,
+                ip_address TEXT NOT NULL,
+                device_info TEXT,
+                visit_count INTEGER,
+                record_button_count INTEGER,
+                send_button_count INTEGER,
+                read_button_count INTEGER,
+                first_visit_time TIMESTAMP,
+                last_visit_time TIMESTAMP,
+                archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        while True:
+            with connection:
+                cursor = connection.cursor()
+                cursor.execute(f"""
+                    INSERT OR REPLACE INTO archive.visitor_stats_archive ({VISITOR_COLUMNS})
+                    SELECT {VISITOR_COLUMNS} FROM main.visitor_stats WHERE id IN ({stale})
+                """)
+                moved = cursor.rowcount
+                if moved <= 0:
+                    break
+                cursor.execute(f"""
+                    INSERT INTO visitor_stats_rollup
+                    (period, visitors, visits, record_uses, send_uses, read_uses)
+                    SELECT
+                        strftime('%Y-%m', last_visit_time),
+                        COUNT(*),
+                        COALESCE(SUM(visit_count), 0),
+                        COALESCE(SUM(record_button_count), 0),
+                        COALESCE(SUM(send_button_count), 0),
+                        COALESCE(SUM(read_button_count), 0)
+                    FROM visitor_stats WHERE id IN ({stale})
+                    GROUP BY 1
+                    ON CONFLICT(period) DO UPDATE SET
+                        visitors = visitors + excluded.visitors,
+                        visits = visits + excluded.visits,
+                        record_uses = record_uses + excluded.record_uses,
+                        send_uses = send_uses + excluded.send_uses,
+                        read_uses = read_uses + excluded.read_uses
+                """)
+                cursor.execute(f"DELETE FROM visitor_stats WHERE id IN ({stale})")
+                archived += cursor.rowcount
+
+        if archived:
+            logger.info("Archived %d inactive visitors", archived)
+        return archived
+    except Exception as e:
+        logger.error("Error archiving visitors: %s", e)
+        return archived
+    finally:
+        connection.close()
+
+
+def enable_incremental_vacuum():
+    """
+    One-time migration: switch the database to incremental auto-vacuum, which needs a full VACUUM.
+    Run from run.py before the server starts, never from the workers.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    try:
+        # auto_vacuum: 0 = none, 1 = full, 2 = incremental
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return True
+        logger.info("Enabling incremental auto-vacuum (one-time full VACUUM)")
+        connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        connection.execute("VACUUM")
+        return True
+    except Exception as e:
+        logger.error("Error enabling incremental auto-vacuum: %s", e)
+        return False
+    finally:
+        connection.close()
+
+
+def compact_database(vacuum_pages=DB_INCREMENTAL_VACUUM_PAGES):
+    """
+    Release free pages and refresh query planner statistics.
+    Pages are only released once enable_incremental_vacuum() has migrated the database.
+    """
+    connection = get_db_connection()
+    if not connection:
+        return False
+
+    try:
+        if connection.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            connection.execute(f"PRAGMA incremental_vacuum({int(vacuum_pages)})")
+        else:
+            logger.debug("Incremental auto-vacuum is not enabled; skipping page release")
+
+        connection.execute("ANALYZE")
+        connection.execute("PRAGMA optimize")
+        return True
+    except Exception as e:
+        logger.error("Error compacting database: %s", e)
+        return False
+    finally:
+        connection.close()
@@ -0,0 +1,73 @@
+import re
+from typing import Dict, NamedTuple, Optional
+
+# Unicode ranges per writing system. Kana marks Japanese even when mixed with kanji (Han).
+SCRIPT_RANGES = {
+    "han": "\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\U00020000-\U0002ffff",
+    "kana": "\u3040-\u309f\u30a0-\u30ff\u31f0-\u31ff\uff66-\uff9f",
+    "hangul": "\u1100-\u11ff\u3130-\u318f\uac00-\ud7af",
+    "cyrillic": "\u0400-\u052f",
+    "greek": "\u0370-\u03ff",
+    "arabic": "\u0600-\u06ff\u0750-\u077f\u08a0-\u08ff\ufb50-\ufdff\ufe70-\ufefe",
+    "hebrew": "\u0590-\u05ff",
+    "devanagari": "\u0900-\u097f",
+    "thai": "\u0e00-\u0e7f",
+    "latin_extended": "\u00c0-\u00d6\u00d8-\u00f6\u00f8-\u024f\u1e00-\u1eff",
+}
+
+# One alternation of character runs, so the text is scanned once by the regex engine.
+# The leading lookahead skips ASCII without trying every alternative at each position.
+SCRIPT_PATTERN = re.compile(
+    "(?=[^\\x00-\\x7f])(?:" + "|".join(f"(?P<{name}>[{ranges}]+)" for name, ranges in SCRIPT_RANGES.items()) + ")"
+)
+
+# Languages implied by a script, where there is a single obvious one
+SCRIPT_LANGUAGES = {
+    "latin": "en",
+    "han": "zh",
+    "japanese": "ja",
+    "hangul": "ko",
+    "greek": "el",
+    "hebrew": "he",
+    "thai": "th",
+}
+
+# Accented Latin letters needed (count and share of the text) to treat text as non-English
+LATIN_EXTENDED_MIN_CHARS = 2
+LATIN_EXTENDED_MIN_RATIO = 0.01
+
+
+class ScriptInfo(NamedTuple):
+    script: str
+    language: Optional[str]
+
+
+def count_scripts(text: str) -> Dict[str, int]:
+    """Number of characters of each non-ASCII script in text"""
+    counts = {}
+    for match in SCRIPT_PATTERN.finditer(text):
+        name = match.lastgroup
+        counts[name] = counts.get(name, 0) + match.end() - match.start()
+    return counts
+
+
+def detect_script(text: str) -> ScriptInfo:
+    """
+    Classify text by its dominant non-Latin script ("latin" for plain or lightly accented text).
+    Any non-Latin characters win over Latin, so mixed replies still get a multilingual voice.
+    """
+    if text.isascii():
+        return ScriptInfo("latin", "en")
+
+    counts = count_scripts(text)
+    if counts.get("kana"):
+        script = "japanese"
+    else:
+        others = {name: count for name, count in counts.items() if name != "latin_extended"}
+        if others:
+            script = max(others, key=others.get)
+        else:
+            accented = counts.get("latin_extended", 0)
+            is_extended = accented >= LATIN_EXTENDED_MIN_CHARS and accented >= LATIN_EXTENDED_MIN_RATIO * len(text)
+            script = "latin_extended" if is_extended else "latin"
+    return ScriptInfo(script, SCRIPT_LANGUAGES.get(script))
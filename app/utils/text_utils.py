@@ -0,0 +1,93 @@
+import re
+from typing import List
+
+# Sentence terminators (Latin and CJK), followed by optional closing quotes/brackets
+SENTENCE_END = re.compile(r'[.!?。！？]+["\'”’)\]」』]*')
+
+CJK_TERMINATORS = ("。", "！", "？")
+
+# Characters of scripts written without spaces between words (CJK, kana, fullwidth forms, Thai);
+# pieces meeting at one of these are joined without a separator
+NO_SPACE_CHARS = re.compile(r'[\u0e00-\u0e7f\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+# Clause separators used when a single sentence is still too long
+CLAUSE_BOUNDARY = re.compile(r'(?<=[,;:，；：、])\s*|\s+[-–—]\s+')
+
+
+def _split_long_piece(piece: str, max_chars: int) -> List[str]:
+    """Split a piece that exceeds max_chars at clause, then word, then hard boundaries"""
+    if len(piece) <= max_chars:
+        return [piece]
+
+    parts = []
+    for clause in (c for c in CLAUSE_BOUNDARY.split(piece) if c and c.strip()):
+        if len(clause) <= max_chars:
+            parts.append(clause)
+            continue
+        # Fall back to word boundaries, then to a hard cut for unbroken runs
+        for word in clause.split(" "):
+            while len(word) > max_chars:
+                parts.append(word[:max_chars])
+                word = word[max_chars:]
+            if word:
+                parts.append(word)
+
+    return _pack(parts, max_chars, separator=" ")
+
+
+def _pack(pieces: List[str], max_chars: int, separator: str) -> List[str]:
+    """Greedily pack pieces into chunks no longer than max_chars"""
+    chunks = []
+    current = ""
+    for piece in pieces:
+        piece = piece.strip()
+        if not piece:
+            continue
+        # CJK and Thai text is not space-separated, so don't introduce spaces there
+        joiner = "" if _joins_without_space(current, piece) else separator
+        candidate = f"{current}{joiner}{piece}" if current else piece
+        if len(candidate) <= max_chars:
+            current = candidate
+        else:
+            if current:
+                chunks.append(current)
+            current = piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _joins_without_space(left: str, right: str) -> bool:
+    return bool(left and right and (NO_SPACE_CHARS.match(left[-1]) or NO_SPACE_CHARS.match(right[0])))
+
+
+def _split_sentences(text: str) -> List[str]:
+    """Split text after sentence terminators, keeping any closing quotes/brackets with the sentence"""
+    sentences = []
+    start = 0
+    for match in SENTENCE_END.finditer(text):
+        end = match.end()
+        # Latin terminators only end a sentence before whitespace (so "3.14" stays whole); CJK ones always do
+        if end < len(text) and not text[end].isspace() and not any(c in CJK_TERMINATORS for c in match.group()):
+            continue
+        sentences.append(text[start:end])
+        start = end
+    sentences.append(text[start:])
+    return sentences
+
+
+def split_text_into_chunks(text: str, max_chars: int) -> List[str]:
+    """
+    Split text into chunks of at most max_chars characters.
+    Prefers sentence boundaries, then clause boundaries, then whitespace.
+    """
+    text = text.strip()
+    if len(text) <= max_chars:
+        return [text] if text else []
+
+    pieces = []
+    for sentence in _split_sentences(text):
+        if sentence and sentence.strip():
+            pieces.extend(_split_long_piece(sentence.strip(), max_chars))
+
+    return _pack(pieces, max_chars, separator=" ")
@@ -0,0 +1,93 @@
+"""
+Startup benchmark: measures how long it takes to import the app and run its
+startup hooks, and fails if it exceeds STARTUP_BUDGET_MS.
+
+Usage: python bench_startup.py [--runs N] [--budget MS] [--top N]
+"""
+import argparse
+import subprocess
+import sys
+
+from app.utils.config import STARTUP_BUDGET_MS
+
+# Imports app.main and runs the lifespan startup, then prints the elapsed time in ms
+READY_SNIPPET = """
+import asyncio, time
+start = time.perf_counter()
+from app.main import app
+async def startup():
+    async with app.router.lifespan_context(app):
+        pass
+asyncio.run(startup())
+print((time.perf_counter() - start) * 1000)
+"""
+
+
+def parse_importtime(stderr):
+    """Parse -X importtime output into (module, self_us, cumulative_us) tuples"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        self_us, cumulative_us, module = int(parts[0]), int(parts[1]), parts[2].strip()
+        rows.append((module, self_us, cumulative_us))
+    return rows
+
+
+def measure_imports():
+    """Run a fresh interpreter with -X importtime and return the parsed rows"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True, text=True, check=True
+    )
+    return parse_importtime(result.stderr)
+
+
+def measure_ready():
+    """Run a fresh interpreter that imports the app and runs startup; return elapsed ms"""
+    result = subprocess.run(
+        [sys.executable, "-c", READY_SNIPPET],
+        capture_output=True, text=True, check=True
+    )
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure app import and startup time")
+    parser.add_argument("--runs", type=int, default=5, help="number of fresh interpreters to sample")
+    parser.add_argument("--budget", type=int, default=STARTUP_BUDGET_MS, help="startup budget in ms")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest modules to list")
+    args = parser.parse_args()
+
+    # Warm the bytecode cache so the first sample isn't dominated by compilation
+    measure_ready()
+
+    import_samples = []
+    rows = []
+    for _ in range(args.runs):
+        rows = measure_imports()
+        total = next((cumulative for module, _, cumulative in rows if module == "app.main"), 0)
+        import_samples.append(total / 1000)
+
+    ready_samples = [measure_ready() for _ in range(args.runs)]
+
+    import_ms = min(import_samples)
+    ready_ms = min(ready_samples)
+
+    print(f"import app.main: {import_ms:.1f} ms (best of {args.runs})")
+    print(f"ready (import + startup): {ready_ms:.1f} ms (best of {args.runs})")
+    print(f"budget: {args.budget} ms")
+    print()
+    print("Slowest modules by self time (last run):")
+    for module, self_us, cumulative_us in sorted(rows, key=lambda r: r[1], reverse=True)[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms self  {cumulative_us / 1000:8.1f} ms cumulative  {module}")
+
+    if ready_ms > args.budget:
+        print(f"\nFAIL: startup took {ready_ms:.1f} ms, over the {args.budget} ms budget", file=sys.stderr)
+        sys.exit(1)
+    print("\nOK: startup is within budget")
+
+
+if __name__ == "__main__":
+    main()
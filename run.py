@@ -1,6 +1,12 @@
-import uvicorn
 import os
+from dotenv import load_dotenv
+
+# Load .env before anything imports app.utils.config, which reads the environment
+load_dotenv()
+
+import uvicorn
 from app.utils.db_utils import init_db
+from app.utils.retention_utils import enable_incremental_vacuum
 
 if __name__ == "__main__":
     # Create required directories if they don't exist
@@ -14,6 +20,9 @@ if __name__ == "__main__":
         print("Database initialized successfully")
     else:
         print("Failed to initialize database")
+
+    # One-time full VACUUM, run here before any worker has the database open
+    enable_incremental_vacuum()
     
     # Run the FastAPI application
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import tempfile
+
+# Point the app at the fake providers and throwaway databases before any app module
+# reads its configuration
+_data_dir = tempfile.mkdtemp(prefix="voicebot-tests-")
+os.environ.update({
+    "ASR_PROVIDER": "fake",
+    "CHAT_PROVIDER": "fake",
+    "TTS_PROVIDER": "fake",
+    "PHRASE_CACHE_ENABLED": "false",
+    "LOG_LEVEL": "CRITICAL",
+    "DATABASE_URL": os.path.join(_data_dir, "visitor_stats.db"),
+    "CACHE_DB_PATH": os.path.join(_data_dir, "shared_cache.db"),
+    "VISITOR_ARCHIVE_PATH": os.path.join(_data_dir, "visitor_stats_archive.db"),
+})
+
+import pytest
+
+from app.utils.cache_utils import SharedCache
+
+
+@pytest.fixture
+def shared_cache(tmp_path):
+    return SharedCache(path=str(tmp_path / "cache.db"), poll_interval=0)
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    """API client without the lifespan; uploads and audio are written under tmp_path"""
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+    from app.utils.config import ensure_directories
+
+    monkeypatch.chdir(tmp_path)
+    ensure_directories()
+    return TestClient(app)
+
+
+def wav_bytes(frames: int = 800) -> bytes:
+    """A short silent WAV file; different frame counts give different audio"""
+    import io
+    import wave
+
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(8000)
+        wav.writeframes(b"\x00\x00" * frames)
+    return buffer.getvalue()
@@ -0,0 +1,33 @@
+import tracemalloc
+
+import pytest
+
+from app.api import admin_routes
+
+
+@pytest.fixture
+def admin_client(client, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    client.headers["X-Admin-Token"] = "secret"
+    yield client
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def test_non_ascii_token_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(admin_routes, "ADMIN_TOKEN", "secret")
+    response = client.get("/api/admin/profiles", headers={"X-Admin-Token": "sécret".encode("latin-1")})
+    assert response.status_code == 403
+
+
+def test_tracemalloc_frames_are_validated(admin_client):
+    assert admin_client.post("/api/admin/tracemalloc/start?frames=0").status_code == 400
+    assert admin_client.post("/api/admin/tracemalloc/start?frames=70000").status_code == 400
+    assert not tracemalloc.is_tracing()
+
+
+def test_tracemalloc_snapshot_and_diff(admin_client):
+    assert admin_client.post("/api/admin/tracemalloc/start?frames=5").json() == {"started": True}
+    assert admin_client.post("/api/admin/tracemalloc/snapshot?limit=5").status_code == 200
+    assert admin_client.post("/api/admin/tracemalloc/diff?limit=5").status_code == 200
+    assert admin_client.post("/api/admin/tracemalloc/stop").json() == {"stopped": True}
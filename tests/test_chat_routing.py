@@ -0,0 +1,91 @@
+import time
+
+from app.services.chat_routing import ChatRouter, LatencyTracker, classify_message
+
+STANDARD_MESSAGE = "Could you tell me about the opening hours of the museum this weekend?"
+
+
+def make_router(shared_cache, probe_rate=0.0, max_age=60):
+    latencies = LatencyTracker(window=20, max_age=max_age, cache=shared_cache)
+    return ChatRouter(primary_model="primary", fast_model="fast", default_budget_ms=1000,
+                      probe_rate=probe_rate, latencies=latencies)
+
+
+def record_slow_turns(router, tier="standard", count=5, latency_ms=5000):
+    for _ in range(count):
+        router.record({"tier": tier, "model": "primary", "max_tokens": 100, "reason": "test"}, latency_ms)
+
+
+def test_classify_message():
+    assert classify_message("Thanks!") == "simple"
+    assert classify_message(STANDARD_MESSAGE) == "standard"
+    assert classify_message("Explain why this code fails and how to debug it: x = [1, 2]") == "complex"
+
+
+def test_simple_messages_use_fast_model(shared_cache):
+    route = make_router(shared_cache).choose("Hi there")
+    assert route["tier"] == "simple"
+    assert route["model"] == "fast"
+
+
+def test_slow_primary_falls_back_for_standard_turns(shared_cache):
+    router = make_router(shared_cache)
+    assert router.choose(STANDARD_MESSAGE)["model"] == "primary"
+    record_slow_turns(router)
+    assert router.choose(STANDARD_MESSAGE)["model"] == "fast"
+
+
+def test_latency_is_tracked_per_tier(shared_cache):
+    router = make_router(shared_cache)
+    record_slow_turns(router, tier="complex")
+    assert router.choose(STANDARD_MESSAGE)["model"] == "primary"
+
+
+def test_fallback_ends_when_samples_age_out(shared_cache):
+    router = make_router(shared_cache, max_age=0.1)
+    record_slow_turns(router)
+    assert router.choose(STANDARD_MESSAGE)["model"] == "fast"
+    time.sleep(0.2)
+    assert router.choose(STANDARD_MESSAGE)["model"] == "primary"
+
+
+def test_probes_primary_while_falling_back(shared_cache):
+    router = make_router(shared_cache, probe_rate=1.0)
+    record_slow_turns(router)
+    route = router.choose(STANDARD_MESSAGE)
+    assert route["model"] == "primary"
+    assert route["reason"].startswith("probing")
+
+
+def test_samples_are_shared_between_routers(shared_cache):
+    record_slow_turns(make_router(shared_cache))
+    assert make_router(shared_cache).choose(STANDARD_MESSAGE)["model"] == "fast"
+
+
+def test_failures_trigger_fallback(shared_cache):
+    router = make_router(shared_cache)
+    for _ in range(5):
+        router.record_failure({"tier": "standard", "model": "primary", "max_tokens": 100, "reason": "test"}, 20)
+    assert router.choose(STANDARD_MESSAGE)["model"] == "fast"
+
+
+def test_failed_chat_call_is_recorded(client, monkeypatch):
+    from app.api import voice_routes
+    from app.services.providers.fake_provider import FakeChatProvider
+
+    recorded = []
+    monkeypatch.setattr(voice_routes.ChatRouter, "record_failure", lambda self, route, latency_ms: recorded.append(route))
+
+    def fail(self, *args, **kwargs):
+        raise RuntimeError("upstream timeout")
+
+    monkeypatch.setattr(FakeChatProvider, "chat", fail)
+    response = client.post("/api/voice/chat", json={"message": STANDARD_MESSAGE})
+    assert response.status_code == 500
+    assert recorded and recorded[0]["tier"] == "standard"
+
+
+def test_latency_budget_must_be_positive(client):
+    for budget in (0, -100):
+        response = client.post("/api/voice/chat", json={"message": "Hello", "latency_budget_ms": budget})
+        assert response.status_code == 422
@@ -0,0 +1,126 @@
+import asyncio
+import os
+import threading
+import uuid
+
+import pytest
+
+from app.services.idempotency import IdempotencyConflictError, run_idempotent
+from app.utils.config import UPLOADS_DIR
+
+from .conftest import wav_bytes
+
+
+def new_key():
+    return uuid.uuid4().hex
+
+
+def transcribe(client, audio, key, user_agent="tests"):
+    return client.post(
+        "/api/voice/transcribe",
+        files={"file": ("clip.wav", audio, "audio/wav")},
+        headers={"Idempotency-Key": key, "User-Agent": user_agent},
+    )
+
+
+def chat(client, message, key, user_agent="tests"):
+    return client.post(
+        "/api/voice/chat",
+        json={"message": message},
+        headers={"Idempotency-Key": key, "User-Agent": user_agent},
+    )
+
+
+def test_chat_replays_stored_response(client):
+    key = new_key()
+    first = chat(client, "Hello there", key)
+    second = chat(client, "Hello there", key)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+    assert "Idempotent-Replayed" not in first.headers
+
+
+def test_chat_key_reused_for_different_message(client):
+    key = new_key()
+    assert chat(client, "Hello there", key).status_code == 200
+    assert chat(client, "Something else", key).status_code == 422
+
+
+def test_keys_are_scoped_to_the_client(client):
+    key = new_key()
+    chat(client, "Hello there", key, user_agent="first client")
+    other = chat(client, "Hello there", key, user_agent="second client")
+    assert other.status_code == 200
+    assert "Idempotent-Replayed" not in other.headers
+
+
+def test_transcribe_replays_stored_transcript(client):
+    key = new_key()
+    audio = wav_bytes(801)
+    first = transcribe(client, audio, key)
+    second = transcribe(client, audio, key)
+    assert first.status_code == second.status_code == 200
+    assert second.json() == first.json()
+    assert second.headers.get("Idempotent-Replayed") == "true"
+
+
+def test_transcribe_key_reused_for_different_audio(client):
+    key = new_key()
+    assert transcribe(client, wav_bytes(802), key).status_code == 200
+    uploads = set(os.listdir(UPLOADS_DIR))
+    assert transcribe(client, wav_bytes(803), key).status_code == 422
+    # The rejected upload isn't left in the publicly served uploads directory
+    assert set(os.listdir(UPLOADS_DIR)) == uploads
+
+
+def test_concurrent_duplicates_compute_once():
+    key = f"idempotency:test:{new_key()}"
+    calls = []
+    release = threading.Event()
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    async def both():
+        first = asyncio.create_task(run_idempotent([key], compute, "fingerprint"))
+        await asyncio.sleep(0.1)
+        second = asyncio.create_task(run_idempotent([key], compute, "fingerprint"))
+        await asyncio.sleep(0.1)
+        release.set()
+        return await first, await second
+
+    first, second = asyncio.run(both())
+    assert first == ("result", False)
+    assert second == ("result", True)
+    assert len(calls) == 1
+
+
+def test_failures_are_not_stored():
+    key = f"idempotency:test:{new_key()}"
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(run_idempotent([key], fail))
+    assert asyncio.run(run_idempotent([key], lambda: "retried")) == ("retried", False)
+
+
+def test_in_flight_key_reused_for_different_request():
+    key = f"idempotency:test:{new_key()}"
+    release = threading.Event()
+
+    async def both():
+        first = asyncio.create_task(run_idempotent([key], lambda: release.wait(5) and "result", "first"))
+        await asyncio.sleep(0.1)
+        try:
+            with pytest.raises(IdempotencyConflictError):
+                await run_idempotent([key], lambda: "other", "second")
+        finally:
+            release.set()
+            await first
+
+    asyncio.run(both())
@@ -0,0 +1,120 @@
+import time
+
+import pytest
+
+from app.services.transcription_jobs import TranscriptionWorkerPool
+from app.utils import db_utils
+from app.utils.job_utils import (
+    claim_next_job,
+    complete_job,
+    create_jobs,
+    fail_job,
+    get_batch_jobs,
+    get_job,
+    purge_finished_jobs,
+    renew_lease,
+)
+
+
+@pytest.fixture(autouse=True)
+def job_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "DATABASE_URL", str(tmp_path / "jobs.db"))
+    db_utils.init_db()
+
+
+def queue_one(tmp_path, name="clip.wav", data=b"audio"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return create_jobs([(str(path), name)])[0]
+
+
+def test_claim_complete(tmp_path):
+    job = queue_one(tmp_path)
+    claimed = claim_next_job(lease_seconds=60)
+    assert claimed["id"] == job["id"]
+    assert claimed["status"] == "processing"
+    assert claimed["attempts"] == 1
+    assert claim_next_job(lease_seconds=60) is None
+
+    finished = complete_job(job["id"], claimed["lease_owner"], "hello")
+    assert finished["status"] == "completed"
+    assert get_job(job["id"])["text"] == "hello"
+
+
+def test_expired_lease_is_reclaimed_and_old_owner_is_fenced(tmp_path):
+    job = queue_one(tmp_path)
+    first = claim_next_job(lease_seconds=0.05)
+    time.sleep(0.1)
+    second = claim_next_job(lease_seconds=60)
+    assert second["id"] == job["id"]
+    assert second["attempts"] == 2
+
+    assert not renew_lease(job["id"], first["lease_owner"], 60)
+    assert complete_job(job["id"], first["lease_owner"], "stale") is None
+    assert complete_job(job["id"], second["lease_owner"], "fresh")["text"] == "fresh"
+
+
+def test_renewed_lease_is_not_reclaimed(tmp_path):
+    queue_one(tmp_path)
+    claimed = claim_next_job(lease_seconds=0.2)
+    time.sleep(0.1)
+    assert renew_lease(claimed["id"], claimed["lease_owner"], 60)
+    time.sleep(0.15)
+    assert claim_next_job(lease_seconds=60) is None
+
+
+def test_retry_is_delayed(tmp_path):
+    job = queue_one(tmp_path)
+    claimed = claim_next_job(lease_seconds=60)
+    requeued = fail_job(job["id"], claimed["lease_owner"], "upstream error", retry_in=0.1)
+    assert requeued["status"] == "queued"
+    assert claim_next_job(lease_seconds=60) is None
+    time.sleep(0.15)
+    assert claim_next_job(lease_seconds=60)["attempts"] == 2
+
+
+def test_worker_pool_transcribes_batch(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"clip{index}.wav"
+        path.write_bytes(b"audio")
+        paths.append((str(path), path.name))
+    batch_id = create_jobs(paths)[0]["batch_id"]
+
+    pool = TranscriptionWorkerPool(lambda path: f"text of {path.rsplit('/', 1)[-1]}", num_workers=2)
+    pool.start()
+    try:
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            jobs = get_batch_jobs(batch_id)
+            if all(job["status"] == "completed" for job in jobs):
+                break
+            pool.notify()
+            time.sleep(0.05)
+    finally:
+        pool.stop()
+
+    assert [job["text"] for job in jobs] == ["text of clip0.wav", "text of clip1.wav", "text of clip2.wav"]
+    # Finished uploads are removed
+    assert not any((tmp_path / name).exists() for _, name in paths)
+
+
+def test_finished_jobs_are_purged_after_retention(tmp_path):
+    finished, running, recent = (queue_one(tmp_path, f"clip{i}.wav") for i in range(3))
+    for job in (finished, running, recent):
+        claimed = claim_next_job(lease_seconds=60)
+        if claimed["id"] != running["id"]:
+            complete_job(claimed["id"], claimed["lease_owner"], "done")
+
+    connection = db_utils.get_db_connection()
+    with connection:
+        connection.execute(
+            "UPDATE transcription_jobs SET updated_at = datetime('now', '-10 days') WHERE id IN (?, ?)",
+            (finished["id"], running["id"])
+        )
+    connection.close()
+
+    assert purge_finished_jobs(retention_days=7) == 1
+    assert get_job(finished["id"]) is None
+    assert get_job(running["id"])["status"] == "processing"
+    assert get_job(recent["id"])["status"] == "completed"
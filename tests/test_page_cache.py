@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from app.utils.page_cache import choose_encoding
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def page_client(monkeypatch):
+    # Pages and static files are read relative to the repository root
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    monkeypatch.chdir(REPO_ROOT)
+    return TestClient(app)
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate, br", {"identity", "gzip", "br"}) == "br"
+    assert choose_encoding("br;q=0.5, gzip", {"identity", "gzip", "br"}) == "gzip"
+    assert choose_encoding("gzip;q=0, identity", {"identity", "gzip"}) == "identity"
+    assert choose_encoding("", {"identity", "gzip"}) == "identity"
+    assert choose_encoding("*", {"identity", "gzip"}) == "gzip"
+
+
+def test_identity_page_is_not_gzipped(page_client):
+    response = page_client.get("/test", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["ETag"].endswith('-identity"')
+
+
+def test_gzip_page_etag_names_gzip(page_client):
+    response = page_client.get("/test", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers["ETag"].endswith('-gzip"')
+
+
+def test_static_files_are_not_gzipped(page_client):
+    response = page_client.get("/static/test.html", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_api_responses_respect_q_zero(client):
+    message = "word " * 200
+    compressed = client.post("/api/voice/chat", json={"message": message}, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers.get("Content-Encoding") == "gzip"
+    plain = client.post("/api/voice/chat", json={"message": message}, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "Content-Encoding" not in plain.headers
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from app.services.elevenlabs_service import ElevenLabsService
+from app.services.phrase_cache import PhraseCache
+from app.services.providers.base import SpeechProvider
+
+CATALOGUE = [{"voice_id": "voice-1", "name": "First"}]
+
+
+class StubSpeechProvider(SpeechProvider):
+    """Voice catalogue that can be made to fail; answers failures with a default list like ElevenLabs"""
+
+    name = "stub"
+
+    def __init__(self):
+        self.available = True
+        self.synthesized = []
+
+    def synthesize(self, text, voice_id):
+        self.synthesized.append(text)
+        raise ValueError("not needed by these tests")
+
+    def list_voices(self, fallback=True):
+        if self.available:
+            return CATALOGUE
+        if not fallback:
+            raise ValueError("voices unavailable")
+        return [{"voice_id": "default", "name": "Default"}]
+
+
+@pytest.fixture
+def phrase_cache(tmp_path):
+    manifest = tmp_path / "phrases.json"
+    manifest.write_text(json.dumps({"voice-1": ["Hello!"]}))
+    return PhraseCache(StubSpeechProvider(), manifest_path=str(manifest), cache_dir=str(tmp_path / "phrases"))
+
+
+def test_catalogue_outage_is_not_a_change(phrase_cache):
+    provider = phrase_cache.provider
+    assert not phrase_cache.refresh_if_catalogue_changed()
+
+    provider.available = False
+    assert not phrase_cache.refresh_if_catalogue_changed()
+    provider.available = True
+    assert not phrase_cache.refresh_if_catalogue_changed()
+    assert provider.synthesized == []
+
+
+def test_elevenlabs_voices_fallback_only_when_asked():
+    service = ElevenLabsService()
+    service.api_key = None
+    assert service.get_available_voices()[0]["name"] == "Rachel (Default)"
+    with pytest.raises(ValueError):
+        service.get_available_voices(fallback=False)
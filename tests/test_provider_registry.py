@@ -0,0 +1,89 @@
+import pytest
+
+from app.services.providers import registry
+from app.services.providers.base import TranscriptionProvider
+from app.services.providers.fake_provider import FakeChatProvider, FakeTranscriptionProvider
+
+from .conftest import wav_bytes
+
+
+class NamedTranscriptionProvider(TranscriptionProvider):
+    def __init__(self, name, fail=False):
+        self.name = name
+        self.fail = fail
+
+    def transcribe(self, audio_file_path: str) -> str:
+        if self.fail:
+            raise RuntimeError(f"{self.name} is down")
+        return f"{self.name} transcript"
+
+
+@pytest.fixture
+def short_clip_provider(monkeypatch):
+    """Route clips under 2 seconds to a registered 'short' provider"""
+    monkeypatch.setattr(registry, "ASR_SHORT_CLIP_PROVIDER", "short")
+    monkeypatch.setattr(registry, "ASR_SHORT_CLIP_MAX_SECONDS", 2.0)
+    monkeypatch.setitem(registry._FACTORIES["transcription"], "short", lambda: None)
+    yield
+    registry._instances.pop(("transcription", "short"), None)
+
+
+@pytest.fixture
+def clip(tmp_path):
+    def write(seconds):
+        path = tmp_path / f"clip-{seconds}.wav"
+        path.write_bytes(wav_bytes(int(8000 * seconds)))
+        return str(path)
+    return write
+
+
+def test_defaults_come_from_config():
+    assert isinstance(registry.get_transcription_provider(), FakeTranscriptionProvider)
+    assert isinstance(registry.get_chat_provider(), FakeChatProvider)
+
+
+def test_instances_are_shared():
+    assert registry.get_chat_provider() is registry.get_chat_provider()
+
+
+def test_unknown_provider_and_kind():
+    with pytest.raises(ValueError):
+        registry.get_provider("chat", "nonexistent")
+    with pytest.raises(ValueError):
+        registry.register_provider("video", "fake", FakeChatProvider)
+
+
+def test_register_replaces_shared_instance(short_clip_provider):
+    registry.register_provider("transcription", "short", lambda: NamedTranscriptionProvider("first"))
+    assert registry.get_transcription_provider("short").name == "first"
+    registry.register_provider("transcription", "short", lambda: NamedTranscriptionProvider("second"))
+    assert registry.get_transcription_provider("short").name == "second"
+
+
+def test_short_clips_go_to_short_clip_provider(short_clip_provider, clip):
+    registry.register_provider("transcription", "short", lambda: NamedTranscriptionProvider("short"))
+    assert registry.select_transcription_provider(clip(1)).name == "short"
+    assert isinstance(registry.select_transcription_provider(clip(3)), FakeTranscriptionProvider)
+    assert registry.transcribe(clip(1)) == "short transcript"
+
+
+def test_unknown_duration_goes_to_default_provider(short_clip_provider, tmp_path):
+    registry.register_provider("transcription", "short", lambda: NamedTranscriptionProvider("short"))
+    path = tmp_path / "clip.webm"
+    path.write_bytes(b"not audio")
+    assert isinstance(registry.select_transcription_provider(str(path)), FakeTranscriptionProvider)
+
+
+def test_routing_disabled_by_default(clip):
+    assert isinstance(registry.select_transcription_provider(clip(1)), FakeTranscriptionProvider)
+
+
+def test_failed_short_clip_provider_falls_back_to_default(short_clip_provider, clip):
+    registry.register_provider("transcription", "short", lambda: NamedTranscriptionProvider("short", fail=True))
+    assert registry.transcribe(clip(1)).startswith("Fake transcription")
+
+
+def test_default_provider_failure_is_raised(monkeypatch, clip):
+    monkeypatch.setitem(registry._instances, ("transcription", "fake"), NamedTranscriptionProvider("fake", fail=True))
+    with pytest.raises(RuntimeError):
+        registry.transcribe(clip(1))
@@ -0,0 +1,72 @@
+import sqlite3
+
+import pytest
+
+from app.utils import db_utils
+from app.utils.retention_utils import archive_inactive_visitors
+
+
+@pytest.fixture(autouse=True)
+def visitor_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "DATABASE_URL", str(tmp_path / "visitor_stats.db"))
+    db_utils.init_db()
+
+
+@pytest.fixture
+def archive_path(tmp_path):
+    return str(tmp_path / "visitor_stats_archive.db")
+
+
+def add_visitor(device_info, days_ago, visits=1, record=0, send=0, read=0):
+    visitor = db_utils.get_visitor_stats("192.0.2.10", device_info)
+    connection = db_utils.get_db_connection()
+    with connection:
+        connection.execute(
+            """
+            UPDATE visitor_stats SET
+                visit_count = ?, record_button_count = ?, send_button_count = ?, read_button_count = ?,
+                last_visit_time = datetime('now', ?)
+            WHERE id = ?
+            """,
+            (visits, record, send, read, f"-{days_ago} days", visitor["id"])
+        )
+    connection.close()
+    return visitor["id"]
+
+
+def archived_ids(archive_path):
+    connection = sqlite3.connect(archive_path)
+    try:
+        return {row[0] for row in connection.execute("SELECT id FROM visitor_stats_archive")}
+    finally:
+        connection.close()
+
+
+def test_inactive_visitors_move_to_archive(archive_path):
+    old = [add_visitor(f"Old {i}", days_ago=400, visits=3, record=1, send=2, read=3) for i in range(3)]
+    recent = add_visitor("Recent", days_ago=1, visits=2, send=1)
+
+    assert archive_inactive_visitors(retention_days=180, archive_path=archive_path, batch_size=2) == 3
+
+    assert archived_ids(archive_path) == set(old)
+    connection = db_utils.get_db_connection()
+    live = [row["id"] for row in connection.execute("SELECT id FROM visitor_stats")]
+    connection.close()
+    assert live == [recent]
+
+
+def test_stats_totals_are_unchanged(archive_path):
+    for i in range(4):
+        add_visitor(f"Old {i}", days_ago=400 + 40 * i, visits=2 + i, record=i, send=1, read=2)
+    add_visitor("Recent", days_ago=1, visits=7, record=3)
+    before = (db_utils._query_total_visitors(), db_utils._query_usage_stats())
+
+    assert archive_inactive_visitors(retention_days=180, archive_path=archive_path) == 4
+    assert (db_utils._query_total_visitors(), db_utils._query_usage_stats()) == before
+
+
+def test_nothing_to_archive(archive_path):
+    add_visitor("Recent", days_ago=1)
+    assert archive_inactive_visitors(retention_days=180, archive_path=archive_path) == 0
+    assert archive_inactive_visitors(retention_days=0, archive_path=archive_path) == 0
+
@@ -0,0 +1,38 @@
+from app.services import tts_routing
+from app.services.tts_routing import route_text
+from app.utils.config import ELEVENLABS_MODEL_ID, ELEVENLABS_MULTILINGUAL_MODEL_ID
+from app.utils.script_utils import detect_script
+
+
+def test_detect_script():
+    assert detect_script("Hello, how are you?") == ("latin", "en")
+    assert detect_script("Café au lait, très bien") == ("latin_extended", None)
+    assert detect_script("你好，今天天气很好") == ("han", "zh")
+    assert detect_script("こんにちは、元気ですか") == ("japanese", "ja")
+    assert detect_script("안녕하세요") == ("hangul", "ko")
+    assert detect_script("Привет, как дела?").script == "cyrillic"
+    assert detect_script("สวัสดีครับ") == ("thai", "th")
+
+
+def test_one_accented_word_stays_latin():
+    text = "I had a lovely time at the café yesterday with some friends from work"
+    assert detect_script(text).script == "latin"
+
+
+def test_mixed_text_prefers_non_latin_script():
+    assert detect_script("The word for hello is こんにちは").script == "japanese"
+
+
+def test_route_text_picks_model_by_script():
+    assert route_text("Hello there").model_id == ELEVENLABS_MODEL_ID
+    assert route_text("こんにちは").model_id == ELEVENLABS_MULTILINGUAL_MODEL_ID
+
+
+def test_route_cache_is_bounded_and_keyed_by_digest(monkeypatch):
+    monkeypatch.setattr(tts_routing, "TTS_ROUTE_CACHE_SIZE", 3)
+    tts_routing._route_cache.clear()
+    texts = [f"Reply number {i}" for i in range(5)]
+    for text in texts:
+        route_text(text)
+    assert len(tts_routing._route_cache) == 3
+    assert all(isinstance(key, bytes) and len(key) == 20 for key in tts_routing._route_cache)
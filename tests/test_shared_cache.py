@@ -0,0 +1,53 @@
+import time
+
+from app.utils.cache_utils import SharedCache
+
+
+def test_set_get_delete(shared_cache):
+    shared_cache.set("greeting", {"text": "hello"})
+    assert shared_cache.get("greeting") == {"text": "hello"}
+    shared_cache.delete("greeting")
+    assert shared_cache.get("greeting") is None
+
+
+def test_set_expires(shared_cache):
+    shared_cache.set("short", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert shared_cache.get("short") is None
+
+
+def test_add_only_sets_absent_keys(shared_cache):
+    assert shared_cache.add("lock", "first", ttl=60)
+    assert not shared_cache.add("lock", "second", ttl=60)
+    assert shared_cache.get("lock") == "first"
+
+
+def test_add_replaces_expired_key(shared_cache):
+    assert shared_cache.add("lock", "first", ttl=0.05)
+    time.sleep(0.1)
+    assert shared_cache.add("lock", "second", ttl=60)
+
+
+def test_incr_counts_from_zero(shared_cache):
+    assert shared_cache.incr("hits") == 1
+    assert shared_cache.incr("hits", 5) == 6
+    assert shared_cache.get("hits") == 6
+
+
+def test_incr_restarts_expired_counter_with_new_ttl(shared_cache):
+    shared_cache.incr("window", ttl=0.05)
+    time.sleep(0.1)
+    assert shared_cache.incr("window", ttl=60) == 1
+    # The new window's expiry applies, so the counter keeps going
+    time.sleep(0.1)
+    assert shared_cache.incr("window", ttl=60) == 2
+
+
+def test_writes_invalidate_other_processes_near_cache(tmp_path):
+    path = str(tmp_path / "cache.db")
+    first = SharedCache(path=path, poll_interval=0)
+    second = SharedCache(path=path, poll_interval=0)
+    first.set("key", "old")
+    assert second.get("key") == "old"
+    first.set("key", "new")
+    assert second.get("key") == "new"
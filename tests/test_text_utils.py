@@ -0,0 +1,40 @@
+from app.utils.text_utils import split_text_into_chunks
+
+
+def test_short_text_is_one_chunk():
+    assert split_text_into_chunks("  Hello there.  ", 100) == ["Hello there."]
+    assert split_text_into_chunks("   ", 100) == []
+
+
+def test_splits_on_sentences_within_limit():
+    text = "The first sentence is here. The second one follows it. And a third ends the reply."
+    chunks = split_text_into_chunks(text, 60)
+    assert all(len(chunk) <= 60 for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+def test_closing_quotes_stay_with_their_sentence():
+    text = 'She said "Let us go now." Then they left the building together quietly.'
+    chunks = split_text_into_chunks(text, 40)
+    assert chunks[0] == 'She said "Let us go now."'
+    assert " ".join(chunks) == text
+
+
+def test_decimal_points_do_not_end_sentences():
+    text = "Pi is roughly 3.14 and that is close enough. Most people round it down."
+    assert split_text_into_chunks(text, 50)[0] == "Pi is roughly 3.14 and that is close enough."
+
+
+def test_cjk_sentences_are_joined_without_spaces():
+    text = "今日はとても良い天気ですね。散歩に行きましょう。公園はすぐ近くです。"
+    chunks = split_text_into_chunks(text, 20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    assert "".join(chunks) == text
+    assert not any(" " in chunk for chunk in chunks)
+
+
+def test_long_sentence_is_split_on_clauses_then_words():
+    text = "This sentence has many clauses, each one fairly short, but together they run long"
+    chunks = split_text_into_chunks(text, 30)
+    assert all(len(chunk) <= 30 for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
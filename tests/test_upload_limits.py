@@ -0,0 +1,110 @@
+import os
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.main import UPLOAD_REQUEST_LIMITS, UploadSizeLimitMiddleware
+from app.utils.audio_utils import convert_webm_to_wav
+from app.utils.config import UPLOADS_DIR
+
+from .conftest import wav_bytes
+
+
+def make_client(limit=100):
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(request: Request):
+        return {"received": len(await request.body())}
+
+    app.add_middleware(UploadSizeLimitMiddleware, limits={"/upload": limit})
+    return TestClient(app)
+
+
+def chunks(total, size=10):
+    for _ in range(total // size):
+        yield b"x" * size
+
+
+def test_body_within_limit_is_passed_through():
+    response = make_client().post("/upload", content=b"x" * 100)
+    assert response.status_code == 200
+    assert response.json() == {"received": 100}
+
+
+def test_content_length_over_limit_is_rejected():
+    assert make_client().post("/upload", content=b"x" * 101).status_code == 413
+
+
+def test_chunked_body_over_limit_is_rejected():
+    response = make_client().post("/upload", content=chunks(200))
+    assert response.status_code == 413
+
+
+def test_chunked_body_within_limit_is_passed_through():
+    response = make_client().post("/upload", content=chunks(50))
+    assert response.json() == {"received": 50}
+
+
+def test_trailing_slash_is_limited_too():
+    assert make_client().post("/upload/", content=chunks(200)).status_code == 413
+
+
+def test_transcribe_rejects_chunked_upload_over_limit(client, monkeypatch):
+    monkeypatch.setitem(UPLOAD_REQUEST_LIMITS, "/api/voice/transcribe", 1000)
+    boundary = "testboundary"
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"clip.wav\"\r\n"
+        f"Content-Type: audio/wav\r\n\r\n"
+    ).encode() + wav_bytes(8000) + f"\r\n--{boundary}--\r\n".encode()
+
+    def stream():
+        for start in range(0, len(body), 512):
+            yield body[start:start + 512]
+
+    response = client.post(
+        "/api/voice/transcribe",
+        content=stream(),
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    assert response.status_code == 413
+
+
+def test_limit_message_reports_endpoint_limit():
+    response = make_client(limit=100).post("/upload", content=b"x" * 101)
+    assert "100 bytes" in response.json()["detail"]
+
+
+def test_failed_batch_removes_saved_files(client, monkeypatch):
+    from app.api import voice_routes
+
+    def fail(files, webhook_url=None):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(voice_routes, "create_jobs", fail)
+    response = client.post(
+        "/api/voice/transcribe/jobs",
+        files=[("files", ("a.wav", wav_bytes(800), "audio/wav")), ("files", ("b.wav", wav_bytes(801), "audio/wav"))],
+    )
+    assert response.status_code == 500
+    assert os.listdir(UPLOADS_DIR) == []
+
+
+def test_webm_conversion_is_capped_past_duration_limit(client, monkeypatch):
+    from pydub import AudioSegment
+
+    requested = {}
+
+    class Segment:
+        def export(self, path, format):
+            open(path, "wb").close()
+
+    def from_file(path, duration=None, **kwargs):
+        requested["duration"] = duration
+        return Segment()
+
+    monkeypatch.setattr(AudioSegment, "from_file", staticmethod(from_file))
+    webm_path = os.path.join(UPLOADS_DIR, "clip.webm")
+    open(webm_path, "wb").close()
+    assert convert_webm_to_wav(webm_path, max_duration=600).endswith(".wav")
+    assert requested["duration"] == 601
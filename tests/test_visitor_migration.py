@@ -0,0 +1,98 @@
+import sqlite3
+
+import pytest
+
+from app.utils import db_utils
+
+# visitor_stats as it was before visitor_key existed
+OLD_SCHEMA = """
+    CREATE TABLE visitor_stats (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ip_address TEXT NOT NULL,
+        device_info TEXT,
+        visit_count INTEGER DEFAULT 1,
+        record_button_count INTEGER DEFAULT 0,
+        send_button_count INTEGER DEFAULT 0,
+        read_button_count INTEGER DEFAULT 0,
+        first_visit_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_visit_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+OLD_ROWS = [
+    # ip, device, visits, record, send, read, first visit, last visit
+    ("198.51.100.1", "Mozilla/5.0 Firefox", 2, 1, 0, 0, "2024-01-05 10:00:00", "2024-02-01 10:00:00"),
+    ("198.51.100.1", "mozilla/5.0  firefox ", 3, 0, 2, 1, "2024-01-01 09:00:00", "2024-03-01 09:00:00"),
+    ("198.51.100.1", "MOZILLA/5.0 FIREFOX", 1, 0, 0, 4, "2024-01-10 08:00:00", "2024-01-20 08:00:00"),
+    ("198.51.100.1", "Safari", 1, 1, 1, 1, "2024-01-02 00:00:00", "2024-01-02 00:00:00"),
+    ("198.51.100.2", "Mozilla/5.0 Firefox", 5, 0, 0, 0, "2024-01-03 00:00:00", "2024-01-03 00:00:00"),
+]
+
+
+@pytest.fixture
+def old_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "visitor_stats.db")
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute(OLD_SCHEMA)
+        connection.executemany(
+            """
+            INSERT INTO visitor_stats
+            (ip_address, device_info, visit_count, record_button_count, send_button_count,
+             read_button_count, first_visit_time, last_visit_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            OLD_ROWS
+        )
+    connection.close()
+    monkeypatch.setattr(db_utils, "DATABASE_URL", path)
+    return path
+
+
+def rows(path):
+    connection = sqlite3.connect(path)
+    connection.row_factory = sqlite3.Row
+    try:
+        return [dict(row) for row in connection.execute("SELECT * FROM visitor_stats ORDER BY id")]
+    finally:
+        connection.close()
+
+
+def test_duplicates_are_merged_into_oldest_row(old_db):
+    assert db_utils.init_db()
+
+    merged, safari, other_ip = rows(old_db)
+    assert merged["id"] == 1
+    assert (merged["visit_count"], merged["record_button_count"], merged["send_button_count"],
+            merged["read_button_count"]) == (6, 1, 2, 5)
+    assert merged["first_visit_time"] == "2024-01-01 09:00:00"
+    assert merged["last_visit_time"] == "2024-03-01 09:00:00"
+    assert merged["visitor_key"] == db_utils.visitor_key("198.51.100.1", "Mozilla/5.0 Firefox")
+    assert safari["visit_count"] == 1
+    assert other_ip["visit_count"] == 5
+
+
+def test_totals_are_unchanged(old_db):
+    assert db_utils.init_db()
+    stats = db_utils._query_usage_stats()
+    assert stats["total_visits"] == sum(row[2] for row in OLD_ROWS)
+    assert stats["total_read_uses"] == sum(row[5] for row in OLD_ROWS)
+
+
+def test_unique_index_exists(old_db):
+    assert db_utils.init_db()
+    connection = sqlite3.connect(old_db)
+    try:
+        indexes = {row[1]: row[2] for row in connection.execute("PRAGMA index_list(visitor_stats)")}
+    finally:
+        connection.close()
+    assert indexes.get("idx_visitor_stats_key") == 1
+
+
+def test_migration_is_idempotent_and_visits_hit_merged_row(old_db):
+    assert db_utils.init_db()
+    assert db_utils.init_db()
+    visitor = db_utils.get_visitor_stats("198.51.100.1", "Mozilla/5.0   FIREFOX")
+    assert visitor["id"] == 1
+    assert visitor["visit_count"] == 7
+    assert len(rows(old_db)) == 3
@@ -0,0 +1,51 @@
+import uuid
+
+import pytest
+
+from app.utils import db_utils
+from app.utils.cache_utils import get_shared_cache
+from app.utils.db_utils import (
+    check_button_usage,
+    get_visitor_stats,
+    increment_button_count,
+    visitor_key,
+)
+
+
+@pytest.fixture(autouse=True)
+def visitor_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(db_utils, "DATABASE_URL", str(tmp_path / "visitor_stats.db"))
+    db_utils.init_db()
+
+
+@pytest.fixture
+def visitor():
+    return "203.0.113.7", f"Browser {uuid.uuid4().hex}"
+
+
+def cached_counts(ip_address, device_info):
+    return get_shared_cache().get(db_utils._button_counts_cache_key(visitor_key(ip_address, device_info)))
+
+
+def test_increment_counts_towards_limit(visitor):
+    get_visitor_stats(*visitor)
+    assert check_button_usage(*visitor, "send") == {"allowed": True, "remaining": 10}
+    for _ in range(3):
+        increment_button_count(*visitor, "send")
+    assert check_button_usage(*visitor, "send") == {"allowed": True, "remaining": 7}
+
+
+def test_updates_invalidate_cached_counts(visitor):
+    get_visitor_stats(*visitor)
+    check_button_usage(*visitor, "record")
+    assert cached_counts(*visitor) == {"record": 0, "send": 0, "read": 0}
+
+    increment_button_count(*visitor, "record")
+    assert cached_counts(*visitor) is None
+    assert check_button_usage(*visitor, "record")["remaining"] == 9
+    assert cached_counts(*visitor)["record"] == 1
+
+
+def test_untracked_visitor_is_not_created(visitor):
+    assert increment_button_count(*visitor, "read") is None
+    assert check_button_usage(*visitor, "read") == {"allowed": True, "remaining": 10}